@@ -1,29 +1,47 @@
-from typing import Generator
+from typing import Generator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core import security
-from app.db.session import get_db
+from app.db.session import get_db, AsyncSessionLocal, ReadSessionLocal, wrote_recently
 from app.models.models import User
 from app.schemas.user import TokenPayload
+from app.services.principal_cache import principal_cache
 from sqlalchemy import select
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
+optional_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/login/access-token", auto_error=False
+)
+
+async def get_read_db(token: Optional[str] = Depends(optional_oauth2)):
+    """
+    Session for read-only endpoints. Uses the replica when one is configured,
+    unless the requesting user wrote recently (read-your-writes).
+    """
+    use_primary = ReadSessionLocal is None
+    if not use_primary and token:
+        try:
+            user_id = int(security.decode_access_token(token).get("sub"))
+            use_primary = wrote_recently(user_id)
+        except (jwt.JWTError, TypeError, ValueError):
+            pass
+    session_factory = AsyncSessionLocal if use_primary else ReadSessionLocal
+    async with session_factory() as session:
+        yield session
 
 async def get_current_user(
-    db: AsyncSession = Depends(get_db), token: str = Depends(reusable_oauth2)
+    db: AsyncSession = Depends(get_db, scope="function"), token: str = Depends(reusable_oauth2)
 ) -> User:
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = security.decode_access_token(token)
         token_data = TokenPayload(**payload)
     except (jwt.JWTError, ValidationError):
         raise HTTPException(
@@ -31,11 +49,24 @@ async def get_current_user(
             detail="Could not validate credentials",
         )
     
+    # Lets the session attribute committed writes to this user (read-your-writes)
+    db.info["user_id"] = token_data.sub
+
+    snapshot = await principal_cache.get(token_data.sub)
+    if snapshot is not None:
+        # Rebuild the user from the cache and attach it to this session as a
+        # persistent object, so handlers can still modify and commit it
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        db.add(user)
+        return user
+
     result = await db.execute(select(User).where(User.id == token_data.sub))
     user = result.scalar_one_or_none()
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    await principal_cache.set(user.id, principal_cache.snapshot(user))
     return user
 
 def get_current_active_user(
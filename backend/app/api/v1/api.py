@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import login, users, events, websocket, clubs, communities, travel, chat, notifications, verifications, marketplace, colleges
+from app.api.v1.endpoints import login, users, events, websocket, clubs, communities, travel, chat, notifications, verifications, marketplace, colleges, metrics
 
 api_router = APIRouter()
 api_router.include_router(login.router, tags=["login"])
@@ -13,4 +13,5 @@ api_router.include_router(notifications.router, prefix="/notifications", tags=["
 api_router.include_router(verifications.router, prefix="/verifications", tags=["verifications"])
 api_router.include_router(marketplace.router, prefix="/marketplace", tags=["marketplace"])
 api_router.include_router(colleges.router, prefix="/colleges", tags=["colleges"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
 api_router.include_router(websocket.router, tags=["websockets"])
@@ -1,40 +1,69 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends
+from typing import Any, List, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.api import deps
-from app.db.session import get_db
+from app.db.session import AsyncSessionLocal
 from app.models.models import Message as MessageModel, User
 from app.schemas.chat import Message
+from app.services.message_cache import message_cache
+from app.utils.pagination import paginate_before, set_next_cursor
 
 router = APIRouter()
 
 @router.get("/{channel}", response_model=List[Message])
 async def read_messages(
     channel: str,
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(deps.get_read_db),
     skip: int = 0,
     limit: int = 100,
+    before: Optional[str] = None,
 ) -> Any:
     """
-    Retrieve message history for a channel.
+    Retrieve message history for a channel, newest first.
+    Pass the X-Next-Cursor header of a page as `before` to fetch older messages.
+    The first page is served from the recent-message cache when possible.
     """
-    result = await db.execute(
-        select(MessageModel)
+    prime_generation = None
+    fetch_limit = limit
+    if not before and skip == 0 and limit <= message_cache.capacity:
+        cached, prime_generation = await message_cache.get_recent(channel, limit)
+        if cached is not None:
+            set_next_cursor(response, cached, limit, "timestamp", "id")
+            return cached
+        # Miss: load a full buffer's worth so later first pages can be cached hits
+        fetch_limit = message_cache.capacity
+
+    # Sender names come from the same query, so a page costs one round-trip
+    query = (
+        select(MessageModel, User.full_name)
+        .outerjoin(User, MessageModel.sender_id == User.id)
         .where(MessageModel.channel == channel)
-        .order_by(MessageModel.timestamp.desc())
-        .offset(skip)
-        .limit(limit)
+        .order_by(MessageModel.timestamp.desc(), MessageModel.id.desc())
     )
-    messages = result.scalars().all()
-    
-    # Populate sender_name from relationship
-    for msg in messages:
-        # Since msg.sender is a relationship, we need to ensure it's loaded
-        # or just fetch names separately for efficiency. 
-        # For simplicity in this async setup, let's assume joined load or fetch.
-        user_result = await db.execute(select(User.full_name).where(User.id == msg.sender_id))
-        msg.sender_name = user_result.scalar_one_or_none() or f"User {msg.sender_id}"
-        
+    if before:
+        query = paginate_before(query, (MessageModel.timestamp, MessageModel.id), before, (datetime, int))
+    else:
+        query = query.offset(skip)
+    if prime_generation is not None and db.info.get("replica"):
+        # Prime from the primary: a lagging replica could miss messages the
+        # writer has already appended to the cache
+        async with AsyncSessionLocal() as primary_db:
+            rows = (await primary_db.execute(query.limit(fetch_limit))).all()
+    else:
+        rows = (await db.execute(query.limit(fetch_limit))).all()
+
+    messages = []
+    for msg, sender_name in rows:
+        msg.sender_name = sender_name or f"User {msg.sender_id}"
+        messages.append(msg)
+
+    if prime_generation is not None:
+        await message_cache.prime(channel, messages, prime_generation)
+        messages = messages[:limit]
+
+    set_next_cursor(response, messages, limit, "timestamp", "id")
     return messages
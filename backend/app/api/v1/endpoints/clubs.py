@@ -12,7 +12,7 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Club])
 async def read_clubs(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     skip: int = 0,
     limit: int = 100,
 ) -> Any:
@@ -25,7 +25,7 @@ async def read_clubs(
 @router.post("/", response_model=Club)
 async def create_club(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     club_in: ClubCreate,
     current_user = Depends(deps.get_current_active_superuser),
 ) -> Any:
@@ -34,14 +34,13 @@ async def create_club(
     """
     db_obj = ClubModel(**club_in.dict())
     db.add(db_obj)
-    await db.commit()
-    await db.refresh(db_obj)
+    await db.flush()
     return db_obj
 
 @router.get("/{id}", response_model=Club)
 async def read_club(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     id: int,
 ) -> Any:
     """
@@ -6,9 +6,10 @@ import uuid
 import secrets
 
 from app.api import deps
-from app.db.session import get_db
-from app.models.models import College as CollegeModel, User as UserModel
+from app.db.session import get_db, on_commit
+from app.models.models import College as CollegeModel, Event as EventModel, User as UserModel
 from app.core import security
+from app.services.principal_cache import principal_cache
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -31,7 +32,7 @@ class CollegeResponse(CollegeBase):
 @router.post("/", response_model=CollegeResponse)
 async def create_college(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     college_in: CollegeCreate,
     current_user: UserModel = Depends(deps.get_current_active_superuser),
 ) -> Any:
@@ -49,13 +50,12 @@ async def create_college(
         invite_code=invite_code
     )
     db.add(db_obj)
-    await db.commit()
-    await db.refresh(db_obj)
+    await db.flush()
     return db_obj
 
 @router.get("/", response_model=List[CollegeResponse])
 async def read_colleges(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(deps.get_read_db),
     skip: int = 0,
     limit: int = 100,
 ) -> Any:
@@ -68,7 +68,7 @@ async def read_colleges(
 @router.post("/invite-admin")
 async def invite_college_admin(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     email: str,
     college_id: int,
     current_user: UserModel = Depends(deps.get_current_active_superuser),
@@ -85,7 +85,7 @@ async def invite_college_admin(
         temp_password = secrets.token_urlsafe(16)
         user = UserModel(
             email=email,
-            hashed_password=security.get_password_hash(temp_password),
+            hashed_password=await security.get_password_hash_async(temp_password),
             full_name="College Admin",
             role="college_admin",
             college_id=college_id
@@ -95,13 +95,15 @@ async def invite_college_admin(
         user.role = "college_admin"
         user.college_id = college_id
     
-    await db.commit()
+    # A user created here has nothing cached yet
+    if user.id is not None:
+        on_commit(db, principal_cache.invalidate, user.id)
     return {"message": f"User {email} is now an admin for college {college_id}"}
 
 @router.delete("/{id}")
 async def delete_college(
     id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     current_user: UserModel = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
@@ -111,6 +113,12 @@ async def delete_college(
     college = result.scalar_one_or_none()
     if not college:
         raise HTTPException(status_code=404, detail="College not found")
+
+    from app.services import event_service
+    students = await db.execute(select(UserModel.id).where(UserModel.college_id == id))
+    events = await db.execute(select(EventModel.id).where(EventModel.college_id == id))
+    await event_service.remove_users(db, list(students.scalars()), list(events.scalars()))
     await db.delete(college)
-    await db.commit()
+    # The college's users were deleted by the cascade
+    on_commit(db, principal_cache.clear)
     return {"message": f"College '{college.name}' deleted"}
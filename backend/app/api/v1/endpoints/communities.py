@@ -12,7 +12,7 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Community])
 async def read_communities(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     skip: int = 0,
     limit: int = 100,
 ) -> Any:
@@ -25,7 +25,7 @@ async def read_communities(
 @router.post("/", response_model=Community)
 async def create_community(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     community_in: CommunityCreate,
     current_user = Depends(deps.get_current_active_superuser),
 ) -> Any:
@@ -34,6 +34,5 @@ async def create_community(
     """
     db_obj = CommunityModel(**community_in.dict())
     db.add(db_obj)
-    await db.commit()
-    await db.refresh(db_obj)
+    await db.flush()
     return db_obj
@@ -1,38 +1,52 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
+from typing import Any, List, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from pathlib import Path
 
 from app.api import deps
-from app.db.session import get_db
+from app.core.config import settings
+from app.db.session import get_db, on_commit
 from app.models.models import Event as EventModel, User as UserModel, Notification as NotificationModel
-from app.schemas.event import Event, EventCreate, EventUpdate
+from app.schemas.event import Event, EventCreate, EventUpdate, EventBulkUsers, EventBulkResult, Participation
+from app.utils.pagination import paginate_before, set_next_cursor
 from app.websockets.manager import manager
 
 router = APIRouter()
 
+# Largest batch accepted by the bulk registration / check-in endpoints
+MAX_BULK_USERS = 5000
+
 @router.get("/", response_model=List[Event])
 async def read_events(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(deps.get_read_db),
     current_user: UserModel = Depends(deps.get_current_active_user),
     skip: int = 0,
     limit: int = 100,
+    before: Optional[str] = None,
 ) -> Any:
     """
-    Retrieve events (filtered by college).
+    Retrieve events (filtered by college), newest first.
+    Pass the X-Next-Cursor header of a page as `before` to fetch the next page.
     """
-    query = select(EventModel)
+    query = select(EventModel).order_by(EventModel.created_at.desc(), EventModel.id.desc())
     if not current_user.is_superuser:
         query = query.where(EventModel.college_id == current_user.college_id)
-        
-    result = await db.execute(query.offset(skip).limit(limit))
-    return result.scalars().all()
+
+    if before:
+        query = paginate_before(query, (EventModel.created_at, EventModel.id), before, (datetime, int))
+    else:
+        query = query.offset(skip)
+    result = await db.execute(query.limit(limit))
+    events = result.scalars().all()
+    set_next_cursor(response, events, limit, "created_at", "id")
+    return events
 
 @router.post("/", response_model=Event)
 async def create_event(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     event_in: EventCreate,
     current_user: UserModel = Depends(deps.get_current_active_college_admin),
 ) -> Any:
@@ -44,37 +58,31 @@ async def create_event(
         organizer_id=current_user.id,
         college_id=current_user.college_id
     )
-    db.add(db_obj)
-    await db.commit()
-    await db.refresh(db_obj)
-
-    # Broadcast notification
-    try:
-        new_notif = NotificationModel(
-            title="New Event!",
-            message=f"{db_obj.title} has been organized by {current_user.full_name}",
-            type="info"
-        )
-        db.add(new_notif)
-        await db.commit()
-        await db.refresh(new_notif)
-
-        await manager.broadcast({
-            "type": "notification",
-            "title": new_notif.title,
-            "message": new_notif.message,
-            "notif_type": new_notif.type,
-            "id": new_notif.id
-        })
-    except Exception as e:
-        print(f"Notification Error: {e}")
+    new_notif = NotificationModel(
+        title="New Event!",
+        message=f"{db_obj.title} has been organized by {current_user.full_name}",
+        type="info"
+    )
+    db.add_all([db_obj, new_notif])
+    # One flush inserts both rows; ids and created_at come back via RETURNING.
+    # get_db commits the pair together.
+    await db.flush()
+
+    # Broadcast notification once the event is committed
+    on_commit(db, manager.broadcast, {
+        "type": "notification",
+        "title": new_notif.title,
+        "message": new_notif.message,
+        "notif_type": new_notif.type,
+        "id": new_notif.id
+    })
 
     return db_obj
 
 @router.get("/{id}", response_model=Event)
 async def read_event(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     id: int,
 ) -> Any:
     """
@@ -86,10 +94,10 @@ async def read_event(
         raise HTTPException(status_code=404, detail="Event not found")
     return event
 
-@router.post("/{id}/register")
+@router.post("/{id}/register", response_model=Participation)
 async def register_participation(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     id: int,
     current_user: UserModel = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -99,10 +107,68 @@ async def register_participation(
     from app.services import event_service
     return await event_service.register_for_event(db, current_user.id, id)
 
+async def _get_managed_event(db: AsyncSession, id: int, current_user: UserModel) -> EventModel:
+    result = await db.execute(select(EventModel).where(EventModel.id == id))
+    event = result.scalar_one_or_none()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if not current_user.is_superuser and event.organizer_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return event
+
+def _bulk_result(outcomes: dict) -> dict:
+    summary = {}
+    for status in outcomes.values():
+        summary[status] = summary.get(status, 0) + 1
+    return {
+        "results": [{"user_id": user_id, "status": status} for user_id, status in outcomes.items()],
+        "summary": summary,
+    }
+
+@router.post("/{id}/register/bulk", response_model=EventBulkResult)
+async def bulk_register_participants(
+    *,
+    db: AsyncSession = Depends(get_db, scope="function"),
+    id: int,
+    body: EventBulkUsers,
+    current_user: UserModel = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Register many users for an event (organizer or Super Admin).
+    Reports an outcome per user; seats are given in request order.
+    """
+    if len(body.user_ids) > MAX_BULK_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_USERS} users per request")
+    await _get_managed_event(db, id, current_user)
+
+    from app.services import event_service
+    outcomes = await event_service.bulk_register(db, id, body.user_ids)
+    return _bulk_result(outcomes)
+
+@router.post("/{id}/check-in", response_model=EventBulkResult)
+async def bulk_check_in_participants(
+    *,
+    db: AsyncSession = Depends(get_db, scope="function"),
+    id: int,
+    body: EventBulkUsers,
+    current_user: UserModel = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Mark registered users as attended, e.g. a batch of scanned QR codes
+    (organizer or Super Admin). Reports an outcome per user.
+    """
+    if len(body.user_ids) > MAX_BULK_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_USERS} users per request")
+    await _get_managed_event(db, id, current_user)
+
+    from app.services import event_service
+    outcomes = await event_service.bulk_check_in(db, id, body.user_ids)
+    return _bulk_result(outcomes)
+
 @router.put("/{id}", response_model=Event)
 async def update_event(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     id: int,
     event_in: EventUpdate,
     current_user: UserModel = Depends(deps.get_current_active_user),
@@ -122,14 +188,12 @@ async def update_event(
         setattr(event, field, update_data[field])
     
     db.add(event)
-    await db.commit()
-    await db.refresh(event)
     return event
 
 @router.delete("/{id}", response_model=Event)
 async def delete_event(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     id: int,
     current_user: UserModel = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -143,23 +207,27 @@ async def delete_event(
     if not current_user.is_superuser and event.organizer_id != current_user.id:
         raise HTTPException(status_code=400, detail="Not enough permissions")
     
+    from app.services import blob_service, event_service
+    await event_service.remove_event_attendance(db, event.id)
+    await blob_service.release(db, event.image_url)
     await db.delete(event)
-    await db.commit()
     return event
 
 @router.post("/{id}/image", response_model=Event)
 async def upload_event_image(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     id: int,
     file: UploadFile = File(...),
     current_user: UserModel = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Upload an image for an event.
-    Image uploaded to: events/{event_id}/image_{timestamp}
+    Stored once per distinct image as WebP variants under blobs/
     """
-    from app.utils.storage import storage
+    from app.services import blob_service
+    from app.services.image_pipeline import store_image
+    from app.utils.uploads import IMAGE_EXTENSIONS, receive_upload
     
     result = await db.execute(select(EventModel).where(EventModel.id == id))
     event = result.scalar_one_or_none()
@@ -170,34 +238,13 @@ async def upload_event_image(
     if not current_user.is_superuser and event.organizer_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    file_extension = file.filename.split(".")[-1].lower()
-    if file_extension not in ["jpg", "jpeg", "png", "webp"]:
-        raise HTTPException(status_code=400, detail="Invalid file type. Only JPG/PNG/WEBP allowed.")
-    
-    # Read file content
-    contents = await file.read()
-    
-    # Try to upload to Supabase
-    image_url = storage.upload_event_image(
-        event_id=event.id,
-        organizer_id=event.organizer_id,
-        file_path=file.filename,
-        file_content=contents
-    )
-    
-    # Fallback to local storage if Supabase is not configured
-    if image_url is None:
-        upload_dir = Path("static/events")
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        file_name = f"event_{event.id}.{file_extension}"
-        file_path = upload_dir / file_name
-        with file_path.open("wb") as buffer:
-            buffer.write(contents)
-        image_url = f"/static/events/{file_name}"
+    # Stream the file to disk (size-checked, hashed), then store or reuse
+    async with receive_upload(file, IMAGE_EXTENSIONS, settings.UPLOAD_MAX_IMAGE_BYTES) as upload:
+        image_url, variants = await store_image(db, upload)
+    await blob_service.release(db, event.image_url)
     
-    event.image_url = image_url
+    event.image_url, event.image_variants = image_url, variants
     db.add(event)
-    await db.commit()
-    await db.refresh(event)
+    await db.flush()
     return event
 
@@ -10,13 +10,14 @@ from app.core import security
 from app.core.config import settings
 from app.db.session import get_db
 from app.models.models import User
-from app.schemas.user import Token
+from app.schemas.user import Token, RefreshTokenRequest
+from app.services import token_service
 
 router = APIRouter()
 
 @router.post("/login/access-token", response_model=Token)
 async def login_access_token(
-    db: AsyncSession = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+    db: AsyncSession = Depends(get_db, scope="function"), form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, retrieve an access token for future requests
@@ -24,15 +25,51 @@ async def login_access_token(
     result = await db.execute(select(User).where(User.email == form_data.username))
     user = result.scalar_one_or_none()
     
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    if not user or not await security.verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     
+    refresh_token, _ = await token_service.issue_refresh_token(db, user.id)
+
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return {
         "access_token": security.create_access_token(
             user.id, expires_delta=access_token_expires
         ),
         "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+@router.post("/login/refresh-token", response_model=Token)
+async def refresh_access_token(
+    *,
+    db: AsyncSession = Depends(get_db, scope="function"),
+    token_in: RefreshTokenRequest,
+) -> Any:
+    """
+    Exchange a refresh token for a new access token.
+    The refresh token is rotated: the one sent is revoked and a new one returned.
+    """
+    user_id, refresh_token = await token_service.rotate_refresh_token(db, token_in.refresh_token)
+
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return {
+        "access_token": security.create_access_token(
+            user_id, expires_delta=access_token_expires
+        ),
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
     }
+
+@router.post("/login/logout")
+async def logout(
+    *,
+    db: AsyncSession = Depends(get_db, scope="function"),
+    token_in: RefreshTokenRequest,
+) -> Any:
+    """
+    Revoke a refresh token (and all of its rotations).
+    """
+    await token_service.revoke_refresh_token(db, token_in.refresh_token)
+    return {"message": "Logged out"}
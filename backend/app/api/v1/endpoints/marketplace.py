@@ -1,12 +1,13 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from pathlib import Path
 
 from app.api import deps
+from app.core.config import settings
 from app.db.session import get_db
 from app.models.models import MarketplaceItem as MIModel, User as UserModel
+from app.utils.pagination import paginate_before, set_next_cursor
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -20,6 +21,7 @@ class MIResponse(BaseModel):
     price: float
     category: str
     image_url: str | None
+    image_variants: dict[str, str] | None = None
     is_available: bool
     created_at: datetime
     owner_name: str | None = None
@@ -29,17 +31,24 @@ class MIResponse(BaseModel):
 
 @router.get("/", response_model=List[MIResponse])
 async def read_items(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(deps.get_read_db),
     current_user: UserModel = Depends(deps.get_current_active_user),
     skip: int = 0,
     limit: int = 100,
+    before: Optional[str] = None,
 ) -> Any:
-    result = await db.execute(
+    query = (
         select(MIModel, UserModel.full_name)
         .join(UserModel, MIModel.owner_id == UserModel.id)
         .where(MIModel.is_available == True)
-        .offset(skip).limit(limit)
+        .order_by(MIModel.created_at.desc(), MIModel.id.desc())
     )
+    if before:
+        query = paginate_before(query, (MIModel.created_at, MIModel.id), before, (datetime, int))
+    else:
+        query = query.offset(skip)
+    result = await db.execute(query.limit(limit))
     
     items = []
     for row in result:
@@ -47,12 +56,13 @@ async def read_items(
         item_dict = MIResponse.model_validate(item)
         item_dict.owner_name = owner_name
         items.append(item_dict)
+    set_next_cursor(response, items, limit, "created_at", "id")
     return items
 
 @router.post("/", response_model=MIResponse)
 async def create_item(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     title: str = Form(...),
     description: str = Form(...),
     price: float = Form(0.0),
@@ -62,61 +72,36 @@ async def create_item(
 ) -> Any:
     """
     Create a marketplace item.
-    Image uploaded to: marketplace/{user_id}/items/{item_id}/{filename}
+    Image stored once per distinct content as WebP variants under blobs/
     """
-    from app.utils.storage import storage
+    from app.services.image_pipeline import store_image
+    from app.utils.uploads import IMAGE_EXTENSIONS, receive_upload
+    
+    # Stream the image to disk (size-checked, hashed), then store or reuse it.
+    # Done before the insert: blob paths do not depend on the item id.
+    image_url, image_variants = None, None
+    if file:
+        async with receive_upload(file, IMAGE_EXTENSIONS, settings.UPLOAD_MAX_IMAGE_BYTES) as upload:
+            image_url, image_variants = await store_image(db, upload)
     
-    # Create item first (without image URL) to get the ID
     db_obj = MIModel(
         owner_id=current_user.id,
         title=title,
         description=description,
         price=price,
         category=category,
-        image_url=None
+        image_url=image_url,
+        image_variants=image_variants
     )
     db.add(db_obj)
-    await db.commit()
-    await db.refresh(db_obj)
-    
-    # Now upload image if provided
-    if file:
-        ext = file.filename.split(".")[-1].lower()
-        if ext not in ["jpg", "jpeg", "png", "webp"]:
-            raise HTTPException(status_code=400, detail="Invalid file type. Only JPG/PNG/WEBP allowed.")
-        
-        contents = await file.read()
-        
-        # Try to upload to Supabase
-        image_url = storage.upload_marketplace_item(
-            user_id=current_user.id,
-            item_id=db_obj.id,
-            file_path=file.filename,
-            file_content=contents
-        )
-        
-        # Fallback to local storage if Supabase is not configured
-        if image_url is None:
-            upload_dir = Path("static/marketplace")
-            upload_dir.mkdir(parents=True, exist_ok=True)
-            safe_name = f"{current_user.id}_{file.filename}"
-            image_path = f"static/marketplace/{safe_name}"
-            with open(image_path, "wb") as buffer:
-                buffer.write(contents)
-            image_url = image_path.replace("\\", "/")
-        
-        # Update item with image URL
-        db_obj.image_url = image_url
-        db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
+    await db.flush()
     
     return db_obj
 
 @router.delete("/{id}")
 async def delete_item(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     id: int,
     current_user: UserModel = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -128,6 +113,7 @@ async def delete_item(
     if not current_user.is_superuser and item.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
         
+    from app.services import blob_service
+    await blob_service.release(db, item.image_url)
     await db.delete(item)
-    await db.commit()
     return {"message": "Item deleted"}
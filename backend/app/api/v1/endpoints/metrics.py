@@ -0,0 +1,38 @@
+from typing import Any
+from fastapi import APIRouter, Depends
+
+from app.api import deps
+from app.core import security
+from app.db.session import pool_stats
+from app.models.models import User as UserModel
+from app.services.blob_gc import blob_collector
+from app.services.image_pipeline import image_pipeline
+from app.services.message_cache import message_cache
+from app.services.message_writer import message_writer
+from app.services.principal_cache import principal_cache
+from app.services.user_stats import user_stats_refresher
+from app.utils.storage import storage
+from app.websockets.manager import manager
+
+router = APIRouter()
+
+@router.get("/")
+async def read_metrics(
+    current_user: UserModel = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Runtime metrics for this worker process (Super Admin only).
+    """
+    return {
+        "db_pool": pool_stats(),
+        "websockets": manager.stats(),
+        "chat_writer": message_writer.stats(),
+        "chat_cache": message_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "token_cache": security.token_cache.stats(),
+        "password_hashing": security.password_hasher.stats(),
+        "user_stats": user_stats_refresher.stats(),
+        "storage": storage.stats(),
+        "image_pipeline": image_pipeline.stats(),
+        "blob_gc": blob_collector.stats(),
+    }
@@ -1,38 +1,50 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, List, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 
 from app.api import deps
-from app.db.session import get_db
+from app.db.session import get_db, on_commit
 from app.models.models import Notification as NotificationModel, User as UserModel
 from app.schemas.notification import Notification, NotificationCreate
+from app.utils.pagination import paginate_before, set_next_cursor
 from app.websockets.manager import manager
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Notification])
 async def read_notifications(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(deps.get_read_db),
     current_user: UserModel = Depends(deps.get_current_active_user),
     skip: int = 0,
     limit: int = 100,
+    before: Optional[str] = None,
 ) -> Any:
     """
-    Retrieve notifications for the current user.
+    Retrieve notifications for the current user, newest first.
+    Pass the X-Next-Cursor header of a page as `before` to fetch older ones.
     """
-    result = await db.execute(
+    query = (
         select(NotificationModel)
         .where((NotificationModel.user_id == current_user.id) | (NotificationModel.user_id == None))
-        .order_by(NotificationModel.created_at.desc())
-        .offset(skip)
-        .limit(limit)
+        .order_by(NotificationModel.created_at.desc(), NotificationModel.id.desc())
     )
-    return result.scalars().all()
+    if before:
+        query = paginate_before(
+            query, (NotificationModel.created_at, NotificationModel.id), before, (datetime, int)
+        )
+    else:
+        query = query.offset(skip)
+    result = await db.execute(query.limit(limit))
+    notifications = result.scalars().all()
+    set_next_cursor(response, notifications, limit, "created_at", "id")
+    return notifications
 
 @router.post("/read-all")
 async def mark_all_as_read(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     current_user: UserModel = Depends(deps.get_current_active_user),
 ) -> Any:
     """
@@ -43,13 +55,12 @@ async def mark_all_as_read(
         .where(NotificationModel.user_id == current_user.id)
         .values(is_read=True)
     )
-    await db.commit()
     return {"message": "All notifications marked as read"}
 
 @router.post("/send", response_model=Notification)
 async def send_notification(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     notification_in: NotificationCreate,
     current_user: UserModel = Depends(deps.get_current_active_college_admin),
 ) -> Any:
@@ -58,10 +69,9 @@ async def send_notification(
     """
     db_obj = NotificationModel(**notification_in.dict())
     db.add(db_obj)
-    await db.commit()
-    await db.refresh(db_obj)
+    await db.flush()
     
-    # Broadcast via WebSocket
+    # Broadcast via WebSocket once the notification is committed
     broadcast_data = {
         "type": "notification",
         "id": db_obj.id,
@@ -71,8 +81,8 @@ async def send_notification(
     }
     
     if db_obj.user_id:
-        await manager.send_personal_message(broadcast_data, db_obj.user_id)
+        on_commit(db, manager.send_personal_message, broadcast_data, db_obj.user_id)
     else:
-        await manager.broadcast_to_channel(broadcast_data, "general")
+        on_commit(db, manager.broadcast_to_channel, broadcast_data, "general")
         
     return db_obj
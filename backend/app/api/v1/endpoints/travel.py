@@ -12,7 +12,7 @@ router = APIRouter()
 
 @router.get("/", response_model=List[TravelPlan])
 async def read_travel_plans(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     skip: int = 0,
     limit: int = 100,
 ) -> Any:
@@ -25,7 +25,7 @@ async def read_travel_plans(
 @router.post("/", response_model=TravelPlan)
 async def create_travel_plan(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     plan_in: TravelPlanCreate,
     current_user: UserModel = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -37,6 +37,5 @@ async def create_travel_plan(
         organizer_id=current_user.id
     )
     db.add(db_obj)
-    await db.commit()
-    await db.refresh(db_obj)
+    await db.flush()
     return db_obj
@@ -1,21 +1,24 @@
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from pathlib import Path
+from sqlalchemy import select
 
 from app.api import deps
 from app.core import security
-from app.db.session import get_db
+from app.core.config import settings
+from app.db.session import get_db, on_commit
 from app.models.models import User as UserModel
-from app.schemas.user import User, UserCreate, UserUpdate
+from app.schemas.user import User, UserCreate, UserUpdate, Buddy, BuddySuggestion
+from app.services.principal_cache import principal_cache
+from app.utils.pagination import paginate_before, set_next_cursor
+from app.websockets.manager import manager
 
 router = APIRouter()
 
 @router.post("/", response_model=User)
 async def create_user(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     user_in: UserCreate,
     invite_code: Optional[str] = None
 ) -> Any:
@@ -41,71 +44,80 @@ async def create_user(
 
     db_obj = UserModel(
         email=user_in.email,
-        hashed_password=security.get_password_hash(user_in.password),
+        hashed_password=await security.get_password_hash_async(user_in.password),
         full_name=user_in.full_name,
         is_superuser=user_in.is_superuser,
         college_id=college_id,
         role="student" if not user_in.is_superuser else "super_admin"
     )
     db.add(db_obj)
-    await db.commit()
-    await db.refresh(db_obj)
+    await db.flush()
     return db_obj
 
 @router.get("/", response_model=List[User])
 async def read_users(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_db, scope="function"),
     current_user: UserModel = Depends(deps.get_current_active_college_admin),
     skip: int = 0,
     limit: int = 100,
+    before: Optional[str] = None,
 ) -> Any:
     """
-    Retrieve users (filtered by college for college admins).
+    Retrieve users (filtered by college for college admins), newest first.
+    Pass the X-Next-Cursor header of a page as `before` to fetch the next page.
     """
-    query = select(UserModel)
+    query = select(UserModel).order_by(UserModel.id.desc())
     if not current_user.is_superuser:
         query = query.where(UserModel.college_id == current_user.college_id)
-        
-    result = await db.execute(query.offset(skip).limit(limit))
-    return result.scalars().all()
+
+    if before:
+        query = paginate_before(query, (UserModel.id,), before, (int,))
+    else:
+        query = query.offset(skip)
+    result = await db.execute(query.limit(limit))
+    users = result.scalars().all()
+    set_next_cursor(response, users, limit, "id")
+    return users
 
 @router.get("/me", response_model=User)
 async def read_user_me(
-    db: AsyncSession = Depends(get_db),
     current_user: UserModel = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Get current user with stats.
+    events_count and buddies_count are stored counters, see services/user_stats.py.
     """
-    from app.models.models import Participation
-
-    # Count events the user has joined
-    evt_stmt = select(func.count(Participation.id)).where(Participation.user_id == current_user.id)
-    evt_count = await db.execute(evt_stmt)
-    current_user.events_count = evt_count.scalar() or 0
-
-    # buddies_count: count of distinct other users who attended the same events
-    # build a subquery for all event IDs the current user participated in
-    subq = select(Participation.event_id).where(Participation.user_id == current_user.id).subquery()
-    buddy_stmt = (
-        select(func.count(func.distinct(Participation.user_id)))
-        .where(Participation.event_id.in_(subq))
-        .where(Participation.user_id != current_user.id)
-    )
-    buddy_count = await db.execute(buddy_stmt)
-    current_user.buddies_count = buddy_count.scalar() or 0
+    return current_user
 
-    # persist the counters (optional caching/storage)
-    db.add(current_user)
-    await db.commit()
-    await db.refresh(current_user)
+@router.get("/me/buddies", response_model=List[Buddy])
+async def read_my_buddies(
+    db: AsyncSession = Depends(deps.get_read_db),
+    current_user: UserModel = Depends(deps.get_current_active_user),
+    limit: int = 20,
+) -> Any:
+    """
+    Users the current user attended the most events with.
+    """
+    from app.services import event_service
+    return await event_service.get_top_buddies(db, current_user.id, min(limit, 100))
 
-    return current_user
+@router.get("/me/suggestions", response_model=List[BuddySuggestion])
+async def read_my_buddy_suggestions(
+    db: AsyncSession = Depends(deps.get_read_db),
+    current_user: UserModel = Depends(deps.get_current_active_user),
+    limit: int = 20,
+) -> Any:
+    """
+    People you may know: buddies of your buddies, by number of mutual buddies.
+    """
+    from app.services import event_service
+    return await event_service.get_buddy_suggestions(db, current_user.id, min(limit, 100))
 
 @router.put("/me", response_model=User)
 async def update_user_me(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     user_in: UserUpdate,
     current_user: UserModel = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -114,65 +126,60 @@ async def update_user_me(
     """
     update_data = user_in.dict(exclude_unset=True)
     if "password" in update_data:
-        update_data["hashed_password"] = security.get_password_hash(update_data["password"])
+        update_data["hashed_password"] = await security.get_password_hash_async(update_data["password"])
         del update_data["password"]
+        # A new password ends every existing session
+        from app.services import token_service
+        await token_service.revoke_user_refresh_tokens(db, current_user.id)
     
     for field in update_data:
         setattr(current_user, field, update_data[field])
     
     db.add(current_user)
-    await db.commit()
-    await db.refresh(current_user)
+    await db.flush()
+    on_commit(db, principal_cache.invalidate, current_user.id)
+
+    # Keep the identity cached on the user's open websockets in sync
+    on_commit(db, manager.update_user_profile, current_user.id, {
+        "full_name": current_user.full_name,
+        "profile_image_url": current_user.profile_image_url
+    })
     return current_user
 
 @router.post("/me/profile-image", response_model=User)
 async def upload_profile_image(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     file: UploadFile = File(...),
     current_user: UserModel = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Upload a profile image for the current user.
-    Uploaded to: users/{user_id}/profile_picture/{filename}
+    Stored once per distinct image as WebP variants under blobs/
     """
-    from app.utils.storage import storage
+    from app.services import blob_service
+    from app.services.image_pipeline import store_image
+    from app.utils.uploads import IMAGE_EXTENSIONS, receive_upload
     
-    file_extension = file.filename.split(".")[-1].lower()
-    if file_extension not in ["jpg", "jpeg", "png", "webp"]:
-        raise HTTPException(status_code=400, detail="Invalid file type. Only JPG/PNG/WEBP allowed.")
-    
-    # Read file content
-    contents = await file.read()
-    
-    # Try to upload to Supabase
-    image_url = storage.upload_profile_image(
-        user_id=current_user.id,
-        file_path=file.filename,
-        file_content=contents
-    )
-    
-    # Fallback to local storage if Supabase is not configured
-    if image_url is None:
-        upload_dir = Path("static/profile_images")
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        file_name = f"user_{current_user.id}.{file_extension}"
-        file_path = upload_dir / file_name
-        with file_path.open("wb") as buffer:
-            buffer.write(contents)
-        image_url = f"/static/profile_images/{file_name}"
+    # Stream the file to disk (size-checked, hashed), then store or reuse
+    async with receive_upload(file, IMAGE_EXTENSIONS, settings.UPLOAD_MAX_IMAGE_BYTES) as upload:
+        image_url, variants = await store_image(db, upload)
+    await blob_service.release(db, current_user.profile_image_url)
     
     current_user.profile_image_url = image_url
+    current_user.profile_image_variants = variants
     
     db.add(current_user)
-    await db.commit()
-    await db.refresh(current_user)
+    await db.flush()
+    on_commit(db, principal_cache.invalidate, current_user.id)
+
+    on_commit(db, manager.update_user_profile, current_user.id, {"profile_image_url": image_url})
     return current_user
 
 @router.post("/join-college")
 async def join_college(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     invite_code: str,
     current_user: UserModel = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -188,13 +195,13 @@ async def join_college(
     current_user.college_id = college.id
     current_user.college_name = college.name 
     db.add(current_user)
-    await db.commit()
+    on_commit(db, principal_cache.invalidate, current_user.id)
     return {"message": f"Successfully joined {college.name}"}
 
 @router.delete("/{id}")
 async def delete_user(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     id: int,
     current_user: UserModel = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -211,6 +218,11 @@ async def delete_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    # Images of the user's events and items are released by the blob GC's
+    # reference recount after the cascade
+    from app.services import blob_service, event_service
+    await event_service.remove_users(db, [id])
+    await blob_service.release(db, user.profile_image_url)
     await db.delete(user)
-    await db.commit()
+    on_commit(db, principal_cache.invalidate, id)
     return {"message": "User deleted"}
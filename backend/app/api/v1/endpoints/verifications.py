@@ -2,9 +2,9 @@ from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
-from pathlib import Path
 
 from app.api import deps
+from app.core.config import settings
 from app.db.session import get_db
 from app.models.models import VerificationRequest as VRModel, User as UserModel
 from pydantic import BaseModel
@@ -27,7 +27,7 @@ class VRResponse(BaseModel):
 @router.post("/request")
 async def create_verification_request(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     file: UploadFile = File(...),
     current_user: UserModel = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -36,6 +36,7 @@ async def create_verification_request(
     Document uploaded to: users/{user_id}/verification/{filename}
     """
     from app.utils.storage import storage
+    from app.utils.uploads import DOCUMENT_EXTENSIONS, receive_upload
     
     # Check for existing pending request
     existing = await db.execute(
@@ -44,41 +45,26 @@ async def create_verification_request(
     if existing.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="A pending verification request already exists.")
 
-    # Validate file type
-    ext = file.filename.split(".")[-1].lower()
-    if ext not in ["jpg", "jpeg", "png", "pdf"]:
-        raise HTTPException(status_code=400, detail="Invalid file type. Only JPG/PNG/PDF allowed.")
-
-    # Read file content
-    contents = await file.read()
-    
-    # Try to upload to Supabase
-    id_card_url = storage.upload_verification_document(
-        user_id=current_user.id,
-        file_path=file.filename,
-        file_content=contents
-    )
-    
-    # Fallback to local storage if Supabase is not configured
+    # Validate and stream the file to disk (size-checked, hashed), then to storage
+    async with receive_upload(file, DOCUMENT_EXTENSIONS, settings.UPLOAD_MAX_DOCUMENT_BYTES) as upload:
+        id_card_url = await storage.upload_verification_document(
+            user_id=current_user.id,
+            file_path=file.filename,
+            file_content=upload.path
+        )
     if id_card_url is None:
-        upload_dir = Path("static/verifications")
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        file_path = upload_dir / f"id_{current_user.id}_{file.filename}"
-        with file_path.open("wb") as buffer:
-            buffer.write(contents)
-        id_card_url = str(file_path).replace("\\", "/")
-        
+        raise HTTPException(status_code=502, detail="Document upload failed")
+
     db_obj = VRModel(
         user_id=current_user.id,
         id_card_url=id_card_url
     )
     db.add(db_obj)
-    await db.commit()
     return {"message": "Verification request submitted successfully"}
 
 @router.get("/", response_model=List[VRResponse])
 async def read_verification_requests(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     current_user: UserModel = Depends(deps.get_current_active_college_admin),
     status: str = "pending"
 ) -> Any:
@@ -110,7 +96,7 @@ async def read_verification_requests(
 @router.post("/{id}/approve")
 async def approve_request(
     id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     current_user: UserModel = Depends(deps.get_current_active_college_admin),
 ) -> Any:
     """Approve a verification request."""
@@ -121,14 +107,13 @@ async def approve_request(
 
     vr.status = "approved"
     db.add(vr)
-    await db.commit()
     return {"message": "Approved"}
 
 @router.post("/{id}/reject")
 async def reject_request(
     id: int,
     note: Optional[str] = None,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     current_user: UserModel = Depends(deps.get_current_active_college_admin),
 ) -> Any:
     """Reject a verification request with an optional admin note."""
@@ -140,5 +125,4 @@ async def reject_request(
     vr.status = "rejected"
     vr.admin_note = note
     db.add(vr)
-    await db.commit()
     return {"message": "Rejected"}
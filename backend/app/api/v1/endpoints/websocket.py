@@ -2,11 +2,12 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from sqlalchemy import select
 from app.websockets.manager import manager
 from app.api import deps
-from app.models.models import User, Message
+from app.models.models import User
 from app.db.session import AsyncSessionLocal
-from jose import jwt
+from app.services.message_writer import message_writer
+from app.core import security
 from app.core.config import settings
-from datetime import datetime
+from datetime import datetime, timezone
 
 router = APIRouter()
 
@@ -14,49 +15,76 @@ router = APIRouter()
 async def websocket_endpoint(websocket: WebSocket, token: str):
     # Verify token manually for websocket because it doesn't support headers easily
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = security.decode_access_token(token)
         user_id = int(payload.get("sub"))
     except:
         await websocket.close(code=4003)
         return
 
-    await manager.connect(websocket, user_id)
+    # Load the sender's identity once; it is reused for every message on this socket
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(User.full_name, User.profile_image_url).where(User.id == user_id)
+        )
+        row = result.one_or_none()
+    if row is None:
+        await websocket.close(code=4003)
+        return
+
+    connection = await manager.connect(
+        websocket, user_id, {"full_name": row.full_name, "profile_image_url": row.profile_image_url}
+    )
     try:
         while True:
             # Expecting JSON data: {"content": "...", "channel": "..."}
+            # or a subscription frame: {"type": "join" | "leave", "channel": "..."}
             data = await websocket.receive_json()
-            content = data.get("content")
+            # NUL is not valid in Postgres text columns
+            content = (data.get("content") or "").replace("\x00", "")
             channel = data.get("channel", "general")
-            
+
+            if data.get("type") == "join":
+                manager.join(connection, channel)
+                continue
+            if data.get("type") == "leave":
+                manager.leave(connection, channel)
+                continue
+
             if content:
-                # Save to database
-                async with AsyncSessionLocal() as db:
-                    new_msg = Message(
-                        sender_id=user_id,
-                        content=content,
-                        channel=channel
-                    )
-                    db.add(new_msg)
-                    await db.commit()
-                    # Fetch sender name for broadcast
-                    user_data = await db.execute(select(User.full_name).where(User.id == user_id))
-                    sender_name = user_data.scalar_one_or_none() or f"User {user_id}"
-
-                    # Prepare message to broadcast
-                    broadcast_data = {
-                        "id": new_msg.id,
-                        "sender_id": user_id,
-                        "sender_name": sender_name,
-                        "content": content,
-                        "channel": channel,
-                        "timestamp": new_msg.timestamp.isoformat()
-                    }
-                    
-                    # Broadcast to all
-                    await manager.broadcast_to_channel(broadcast_data, channel)
-                    
+                # Posting to a channel subscribes the sender so they see replies
+                manager.join(connection, channel)
+
+                # The row is persisted by the batched message writer. The timestamp
+                # is assigned here so the broadcast matches what gets stored.
+                record = {
+                    "sender_id": user_id,
+                    "sender_name": connection.display_name,
+                    "content": content,
+                    "channel": channel,
+                    "timestamp": datetime.now(timezone.utc)
+                }
+                message_id = None
+                if settings.CHAT_PERSISTENCE_MODE == "write_through":
+                    # Wait for the batch containing this message to be committed
+                    message_id = await message_writer.write(record, wait=True)
+                else:
+                    await message_writer.write(record)
+
+                # Prepare message to broadcast
+                broadcast_data = {
+                    "id": message_id,
+                    "sender_id": user_id,
+                    "sender_name": connection.display_name,
+                    "content": content,
+                    "channel": channel,
+                    "timestamp": record["timestamp"].isoformat()
+                }
+
+                # Broadcast to channel subscribers
+                await manager.broadcast_to_channel(broadcast_data, channel)
+
     except WebSocketDisconnect:
-        manager.disconnect(websocket, user_id)
+        manager.disconnect(connection)
     except Exception as e:
         print(f"WS Error: {e}")
-        manager.disconnect(websocket, user_id)
+        manager.disconnect(connection)
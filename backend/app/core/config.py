@@ -10,16 +10,99 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-here"  # Change in production
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # Number of verified access tokens whose claims are cached until expiry
+    TOKEN_CACHE_SIZE: int = 50000
+    # Threads hashing/verifying passwords off the event loop (bcrypt)
+    PASSWORD_HASH_WORKERS: int = 4
+    # Threads running blocking storage requests/file I/O (uploads/deletes)
+    STORAGE_UPLOAD_WORKERS: int = 8
     
     DATABASE_URL: str
+    # Connection pool (per worker process). DB_ECHO logs every statement and
+    # is meant for local debugging only.
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Optional read replica used by read-only listing endpoints. A user's reads
+    # go to the primary for READ_YOUR_WRITES_SECONDS after they write.
+    DATABASE_REPLICA_URL: Optional[str] = None
+    READ_YOUR_WRITES_SECONDS: int = 5
 
     SUPABASE_URL: str
     SUPABASE_SERVICE_ROLE_KEY: str
     SUPABASE_BUCKET: str = "campus-storage"
+    # Upload storage: "auto" (Supabase if configured, else local), "supabase",
+    # "local" or "memory". Local files are served by the /static mount.
+    STORAGE_BACKEND: str = "auto"
+    LOCAL_STORAGE_DIR: str = "static"
+    LOCAL_STORAGE_URL: str = "/static"
+    # Uploads are streamed to a temp file (UPLOAD_TMP_DIR, default system temp)
+    # in UPLOAD_CHUNK_SIZE chunks; larger files are rejected with 413
+    UPLOAD_MAX_IMAGE_BYTES: int = 10 * 1024 * 1024
+    UPLOAD_MAX_DOCUMENT_BYTES: int = 20 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_TMP_DIR: Optional[str] = None
+    # Requests declaring a larger Content-Length are refused before parsing
+    MAX_REQUEST_BYTES: int = 21 * 1024 * 1024
+    # Uploaded images are re-encoded to WebP variants (thumb/card/full) in
+    # IMAGE_PROCESS_WORKERS processes; 0 (or no Pillow) stores originals as-is
+    IMAGE_PROCESS_WORKERS: int = 2
+    IMAGE_WEBP_QUALITY: int = 80
+    # Images are stored once per distinct content (see services/blob_service.py).
+    # Blobs unreferenced for BLOB_GC_GRACE_SECONDS are deleted by a job running
+    # every BLOB_GC_INTERVAL_SECONDS (0 disables); keep the grace period longer
+    # than the interval and than CDN/browser caching of image URLs.
+    BLOB_GC_INTERVAL_SECONDS: int = 3600
+    BLOB_GC_GRACE_SECONDS: int = 86400
 
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
 
+    # WebSocket delivery: per-connection outbound queue size and what to do
+    # when a client falls behind ("drop" messages or "disconnect" the socket)
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_SLOW_CONSUMER_POLICY: str = "disconnect"
+    # "local" keeps delivery in-process; "redis" relays messages between
+    # workers/containers over Redis pub/sub so the websocket tier can scale out
+    WS_BACKPLANE: str = "local"
+    WS_BACKPLANE_CHANNEL: str = "campuslink:ws"
+
+    # Chat persistence: messages are inserted in batches of up to
+    # CHAT_WRITE_BATCH_SIZE rows or every CHAT_WRITE_FLUSH_MS milliseconds.
+    # "write_behind" broadcasts immediately (without the message id);
+    # "write_through" waits for the batch commit and broadcasts with the id.
+    CHAT_PERSISTENCE_MODE: str = "write_behind"
+    CHAT_WRITE_BATCH_SIZE: int = 100
+    CHAT_WRITE_FLUSH_MS: int = 50
+
+    # Recent-message cache serving the first page of chat history.
+    # "local" is per process; use "redis" when running several workers.
+    CHAT_CACHE_SIZE: int = 200
+    CHAT_CACHE_BACKEND: str = "local"
+    # Local buffers only see this worker's messages, so they are reloaded
+    # from the database this often
+    CHAT_CACHE_LOCAL_TTL_SECONDS: float = 5
+
+    # Authenticated-user cache used by deps.get_current_user.
+    # "redis" adds a tier shared by all workers on top of the in-process LRU.
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    PRINCIPAL_CACHE_BACKEND: str = "local"
+
+    # Profile counters are maintained on registration and reconciled with
+    # participations/event_buddies every N seconds (0 disables).
+    USER_STATS_REFRESH_SECONDS: int = 300
+    # Events with more registrations than this do not count towards the
+    # event_buddies graph (pairs grow with the square of attendance).
+    # The graph is maintained incrementally against this limit: after
+    # changing it, rebuild the graph with event_service.rebuild_buddy_graph.
+    BUDDY_GRAPH_MAX_EVENT_SIZE: int = 1000
+
     model_config = SettingsConfigDict(case_sensitive=True, env_file=".env")
 
 settings = Settings()
@@ -1,11 +1,22 @@
 from datetime import datetime, timedelta, timezone
 from typing import Any, Union
+import hashlib
+import time
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.utils.cache import TTLCache
+from app.utils.threads import WorkerPool
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Verified claims keyed by the SHA-256 digest of the token, kept until the
+# token expires. Shared by HTTP (deps.get_current_user) and websocket auth.
+token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+
 def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -16,8 +27,35 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def decode_access_token(token: str) -> dict:
+    """
+    Verify a JWT and return its claims, reusing the result of an earlier
+    verification of the same token. Raises jwt.JWTError if it is invalid.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(key)
+    if claims is not None:
+        return claims
+
+    claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)):
+        token_cache.set(key, claims, ttl=exp - time.time())
+    return claims
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+# bcrypt (~250 ms per hash) runs on its own pool; bcrypt releases the GIL, so
+# the pool size is the number of hashes computed in parallel
+password_hasher = WorkerPool(settings.PASSWORD_HASH_WORKERS, "password-hash")
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.run(get_password_hash, password)
@@ -1,16 +1,130 @@
+import logging
+from typing import Any, Awaitable, Callable
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from app.core.config import settings
+from app.utils.cache import TTLCache
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+logger = logging.getLogger(__name__)
+
+def engine_options(url: str) -> dict:
+    """Engine/pool keyword arguments for a database URL, driven by settings"""
+    options = {
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    if url.startswith("postgresql+asyncpg"):
+        # Prepared statement cache per connection; set to 0 behind pgbouncer
+        # in transaction mode, which cannot keep prepared statements
+        options["connect_args"] = {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return options
+
+class PrimarySession(Session):
+    """Sessions bound to the primary; commits are tracked for read-your-writes"""
+
+engine = create_async_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
 
 AsyncSessionLocal = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
+    engine, class_=AsyncSession, sync_session_class=PrimarySession, expire_on_commit=False
 )
 
+# Optional read replica for read-only endpoints (see deps.get_read_db)
+if settings.DATABASE_REPLICA_URL:
+    read_engine = create_async_engine(
+        settings.DATABASE_REPLICA_URL, **engine_options(settings.DATABASE_REPLICA_URL)
+    )
+    ReadSessionLocal = sessionmaker(
+        read_engine, class_=AsyncSession, expire_on_commit=False, info={"replica": True}
+    )
+else:
+    read_engine = None
+    ReadSessionLocal = None
+
 Base = declarative_base()
 
+# Users who committed a write within the last READ_YOUR_WRITES_SECONDS; their
+# reads stay on the primary so they never see a replica that lags behind them.
+# Kept per process, like the other in-process caches.
+recent_writers = TTLCache(maxsize=100000, ttl=settings.READ_YOUR_WRITES_SECONDS)
+
+def mark_recent_write(user_id: int):
+    recent_writers.set(user_id, True)
+
+def wrote_recently(user_id: int) -> bool:
+    return recent_writers.get(user_id) is not None
+
+@event.listens_for(PrimarySession, "after_flush")
+def _track_write(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(PrimarySession, "do_orm_execute")
+def _track_dml(orm_execute_state):
+    # Core insert()/update()/delete() through session.execute never flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(PrimarySession, "after_commit")
+def _record_writer(session):
+    # deps.get_current_user stores the authenticated user id on the session
+    if session.info.pop("wrote", False) and session.info.get("user_id"):
+        mark_recent_write(session.info["user_id"])
+
+@event.listens_for(PrimarySession, "after_rollback")
+def _reset_write(session):
+    session.info.pop("wrote", None)
+
+def upsert_insert(session, model):
+    """
+    INSERT construct of the session's dialect, which adds
+    on_conflict_do_nothing()/on_conflict_do_update(). Postgres in production,
+    SQLite for local runs.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(model)
+
+def on_commit(session, callback: Callable[..., Awaitable[Any]], *args):
+    """
+    Run `await callback(*args)` once get_db has committed the request's unit
+    of work, e.g. websocket broadcasts or cache invalidation. Nothing runs if
+    the request fails and the transaction is rolled back.
+    """
+    session.info.setdefault("after_commit", []).append((callback, args))
+
 async def get_db():
+    """
+    One unit of work per request: handlers add/flush and this dependency
+    commits once. Declare it with Depends(get_db, scope="function") so the
+    commit happens before the response is sent and a failed commit is
+    reported to the client.
+    """
     async with AsyncSessionLocal() as session:
         yield session
         await session.commit()
+        for callback, args in session.info.pop("after_commit", []):
+            try:
+                await callback(*args)
+            except Exception:
+                logger.exception("After-commit callback %s failed", getattr(callback, "__qualname__", callback))
+
+def pool_stats(db_engine=engine) -> dict:
+    """Connection pool utilization for the metrics endpoint"""
+    pool = db_engine.pool
+    stats = {"status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    if "size" in stats and "checkedout" in stats:
+        capacity = stats["size"] + settings.DB_MAX_OVERFLOW
+        stats["utilization"] = round(stats["checkedout"] / capacity, 4) if capacity else None
+    return stats
@@ -1,23 +1,46 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.services.blob_gc import blob_collector
+from app.services.image_pipeline import image_pipeline
+from app.services.message_writer import message_writer
+from app.services.user_stats import user_stats_refresher
+from app.utils.uploads import MaxBodySizeMiddleware
+from app.websockets.manager import manager
 
 from fastapi.staticfiles import StaticFiles
 import os
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start background services (websocket backplane listener, chat writer,
+    # profile counter reconciliation, upload blob GC)
+    await manager.start()
+    await message_writer.start()
+    await user_stats_refresher.start()
+    await blob_collector.start()
+    yield
+    await blob_collector.stop()
+    await user_stats_refresher.stop()
+    await message_writer.stop()
+    await manager.stop()
+    await image_pipeline.stop()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Create static directory if it doesn't exist
-if not os.path.exists("static"):
-    os.makedirs("static")
+if not os.path.exists(settings.LOCAL_STORAGE_DIR):
+    os.makedirs(settings.LOCAL_STORAGE_DIR)
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Mount static files (uploads when using the local storage backend)
+app.mount(settings.LOCAL_STORAGE_URL, StaticFiles(directory=settings.LOCAL_STORAGE_DIR), name="static")
 
 # Set all CORS enabled origins
 app.add_middleware(
@@ -26,7 +49,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(MaxBodySizeMiddleware, max_bytes=settings.MAX_REQUEST_BYTES)
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
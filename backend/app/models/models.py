@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.session import Base
@@ -32,11 +32,14 @@ class User(Base):
     address = Column(String, nullable=True)
     interests = Column(String, nullable=True)
     college_name = Column(String, nullable=True)
-    profile_image_url = Column(String, nullable=True)
+    profile_image_url = Column(String, nullable=True, index=True) # indexed for blob reference counts
+    profile_image_variants = Column(JSON, nullable=True) # {"thumb"|"card"|"full": url}
     theme_preference = Column(String, default="system")
     is_active = Column(Boolean(), default=True)
     is_superuser = Column(Boolean(), default=False)
     
+    # Profile counters: kept current on registration (buddies_count is the
+    # user's number of event_buddies rows) and reconciled by services/user_stats.py
     events_count = Column(Integer, default=0)
     buddies_count = Column(Integer, default=0)
     
@@ -46,8 +49,24 @@ class User(Base):
     travel_plans = relationship("TravelPlan", back_populates="organizer", cascade="all, delete-orphan")
     messages_sent = relationship("Message", back_populates="sender", cascade="all, delete-orphan")
 
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    token_hash = Column(String, unique=True, index=True, nullable=False) # sha256 of the opaque token
+    family_id = Column(String, index=True, nullable=False) # shared by all rotations of one login
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    replaced_by_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Keyset pagination of a college's event list (newest first)
+        Index("ix_events_college_id_created_at_id", "college_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
@@ -55,9 +74,13 @@ class Event(Base):
     location = Column(String)
     start_time = Column(DateTime(timezone=True))
     end_time = Column(DateTime(timezone=True))
-    image_url = Column(String, nullable=True)
+    image_url = Column(String, nullable=True, index=True)
+    image_variants = Column(JSON, nullable=True) # {"thumb"|"card"|"full": url}
     organizer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     college_id = Column(Integer, ForeignKey("colleges.id", ondelete="CASCADE"), nullable=True)
+    capacity = Column(Integer, nullable=True) # None = unlimited
+    # Seats taken; claimed atomically by event_service.register_for_event
+    registered_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     organizer = relationship("User", back_populates="organized_events")
@@ -66,6 +89,12 @@ class Event(Base):
 
 class Participation(Base):
     __tablename__ = "participations"
+    __table_args__ = (
+        # One registration per user and event; also serves per-user lookups
+        Index("ix_participations_user_id_event_id", "user_id", "event_id", unique=True),
+        # Attendees of an event (co-attendance join)
+        Index("ix_participations_event_id_user_id", "event_id", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
@@ -76,6 +105,22 @@ class Participation(Base):
     user = relationship("User", back_populates="participations")
     event = relationship("Event", back_populates="participants")
 
+class EventBuddy(Base):
+    """
+    Co-attendance graph: one row per ordered user pair that attended at least
+    one event together. Maintained on registration by services/event_service.py.
+    """
+    __tablename__ = "event_buddies"
+    __table_args__ = (
+        # Top-K buddies of a user
+        Index("ix_event_buddies_user_id_shared_events", "user_id", "shared_events"),
+        Index("ix_event_buddies_buddy_id", "buddy_id"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    buddy_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    shared_events = Column(Integer, nullable=False, default=0)
+
 class Club(Base):
     __tablename__ = "clubs"
 
@@ -109,6 +154,10 @@ class TravelPlan(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Keyset pagination of channel history (newest first)
+        Index("ix_messages_channel_timestamp_id", "channel", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
@@ -120,6 +169,9 @@ class Message(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True) # Null for broadcast
@@ -131,6 +183,9 @@ class Notification(Base):
 
 class MarketplaceItem(Base):
     __tablename__ = "marketplace_items"
+    __table_args__ = (
+        Index("ix_marketplace_items_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
@@ -138,7 +193,8 @@ class MarketplaceItem(Base):
     description = Column(Text)
     price = Column(Float, default=0.0) # 0 for "free/lend"
     category = Column(String) # books, electronics, etc.
-    image_url = Column(String, nullable=True)
+    image_url = Column(String, nullable=True, index=True)
+    image_variants = Column(JSON, nullable=True) # {"thumb"|"card"|"full": url}
     is_available = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -155,3 +211,25 @@ class VerificationRequest(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User")
+
+class Blob(Base):
+    """
+    A stored upload, keyed by the SHA-256 of its content, so identical files
+    are stored once. ref_count is the number of rows using image_url;
+    maintained by services/blob_service.py, which also collects blobs that
+    stay unreferenced.
+    """
+    __tablename__ = "blobs"
+    __table_args__ = (
+        # Garbage collection scan
+        Index("ix_blobs_ref_count_released_at", "ref_count", "released_at"),
+    )
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    image_url = Column(String, unique=True, nullable=True) # set once stored
+    image_variants = Column(JSON, nullable=True) # {"thumb"|"card"|"full": url}
+    storage_paths = Column(JSON, nullable=True) # every object written for this blob
+    ref_count = Column(Integer, nullable=False, default=0, server_default="0")
+    released_at = Column(DateTime(timezone=True), nullable=True) # when ref_count last hit 0
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
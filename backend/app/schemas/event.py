@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from pydantic import BaseModel
 
@@ -10,6 +10,7 @@ class EventBase(BaseModel):
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
     image_url: Optional[str] = None
+    capacity: Optional[int] = None # None = unlimited
 
 # Properties to receive via API on creation
 class EventCreate(EventBase):
@@ -29,4 +30,28 @@ class EventInDBBase(EventBase):
 
 # Additional properties to return via API
 class Event(EventInDBBase):
-    pass
+    registered_count: Optional[int] = None
+    image_variants: Optional[Dict[str, str]] = None # thumb/card/full WebP URLs
+
+# A user's registration for an event
+class Participation(BaseModel):
+    id: int
+    user_id: int
+    event_id: int
+    status: str
+    registered_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+# Bulk registration / check-in (e.g. a batch of scanned QR codes)
+class EventBulkUsers(BaseModel):
+    user_ids: List[int]
+
+class EventBulkOutcome(BaseModel):
+    user_id: int
+    status: str
+
+class EventBulkResult(BaseModel):
+    results: List[EventBulkOutcome]
+    summary: Dict[str, int]
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from pydantic import BaseModel, EmailStr
 
 # Shared properties
@@ -35,11 +35,31 @@ class UserInDBBase(UserBase):
 class User(UserInDBBase):
     events_count: Optional[int] = None
     buddies_count: Optional[int] = None
+    profile_image_variants: Optional[Dict[str, str]] = None # thumb/card/full WebP URLs
+
+# Co-attendance graph
+class Buddy(BaseModel):
+    id: int
+    full_name: Optional[str] = None
+    profile_image_url: Optional[str] = None
+    profile_image_variants: Optional[Dict[str, str]] = None
+    shared_events: int
+
+class BuddySuggestion(BaseModel):
+    id: int
+    full_name: Optional[str] = None
+    profile_image_url: Optional[str] = None
+    profile_image_variants: Optional[Dict[str, str]] = None
+    mutual_buddies: int
 
 # Token schemas
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenPayload(BaseModel):
     sub: Optional[int] = None
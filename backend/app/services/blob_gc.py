@@ -0,0 +1,85 @@
+"""Periodic garbage collection of unreferenced upload blobs"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.services import blob_service
+
+logger = logging.getLogger(__name__)
+
+
+class BlobCollector:
+    """
+    Every interval, recounts blob references (catching images dropped by
+    cascading deletes) and then deletes blobs that have been unreferenced
+    for longer than the grace period, in batches.
+    """
+
+    def __init__(self, interval_seconds: int = None, grace_seconds: int = None, batch_size: int = 100):
+        self.interval = settings.BLOB_GC_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        self.grace = settings.BLOB_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.failed = 0
+        self.reconciled = 0
+        self.collected = 0
+        self.last_duration_ms: Optional[float] = None
+
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def collect(self) -> int:
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            self.reconciled += await blob_service.reconcile_ref_counts(db)
+            await db.commit()
+        collected = 0
+        while True:
+            # One transaction per batch keeps the row locks short
+            async with AsyncSessionLocal() as db:
+                batch = await blob_service.collect_garbage(db, self.grace, self.batch_size)
+                await db.commit()
+            collected += batch
+            if batch < self.batch_size:
+                break
+        self.runs += 1
+        self.collected += collected
+        self.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        return collected
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "grace_seconds": self.grace,
+            "runs": self.runs,
+            "failed": self.failed,
+            "ref_counts_reconciled": self.reconciled,
+            "blobs_collected": self.collected,
+            "last_duration_ms": self.last_duration_ms,
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await self.collect()
+            except Exception:
+                self.failed += 1
+                logger.exception("Blob GC run failed")
+            await asyncio.sleep(self.interval)
+
+
+blob_collector = BlobCollector()
@@ -0,0 +1,121 @@
+"""Content-addressed uploads: reference counting and garbage collection of blobs"""
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal, upsert_insert
+from app.models.models import Blob, Event, MarketplaceItem, User
+from app.utils.storage import storage
+
+@asynccontextmanager
+async def claim(sha256: str, size: int) -> AsyncIterator[Blob]:
+    """
+    Lock the blob row for content `sha256` in a transaction of its own,
+    creating it unreferenced on first use. The row lock makes concurrent
+    uploads of the same file wait for the first one and then reuse what it
+    stored. A blob whose image_url is None has not been stored yet: the
+    caller writes the objects and fills in the row, which is committed on
+    exit (rolled back if the body raises, so delete what was written first).
+
+    The row is committed before any request references it. An unreferenced
+    row carries released_at, so if the request then fails, the objects are
+    collected after the grace period like any other orphan.
+    """
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            upsert_insert(session, Blob)
+            .values(sha256=sha256, size=size, ref_count=0, released_at=now)
+            .on_conflict_do_update(
+                index_elements=["sha256"],
+                # Restart the grace period of an orphan that is about to be reused
+                set_={"released_at": case((Blob.ref_count <= 0, now), else_=Blob.released_at)},
+            )
+            .returning(Blob)
+        )
+        yield result.scalar_one()
+        await session.commit()
+
+async def acquire(db: AsyncSession, sha256: str):
+    """Take a reference on a stored blob; part of the caller's transaction"""
+    await db.execute(
+        update(Blob)
+        .where(Blob.sha256 == sha256)
+        .values(ref_count=Blob.ref_count + 1, released_at=None)
+        .execution_options(synchronize_session=False)
+    )
+
+async def release(db: AsyncSession, *urls: Optional[str]):
+    """
+    Drop one reference from the blobs stored at `urls` (image URLs being
+    replaced or deleted). URLs that are not blobs, such as files uploaded
+    before deduplication, are ignored.
+    """
+    urls = [url for url in urls if url]
+    if not urls:
+        return
+    await db.execute(
+        update(Blob)
+        .where(Blob.image_url.in_(urls), Blob.ref_count > 0)
+        .values(
+            ref_count=Blob.ref_count - 1,
+            released_at=case((Blob.ref_count <= 1, datetime.now(timezone.utc)), else_=Blob.released_at),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+def _uses():
+    """Number of rows currently pointing at a blob's image_url"""
+    def count(column):
+        return select(func.count()).where(column == Blob.image_url).scalar_subquery()
+    return count(User.profile_image_url) + count(Event.image_url) + count(MarketplaceItem.image_url)
+
+async def reconcile_ref_counts(db: AsyncSession) -> int:
+    """
+    Recount the references of every blob and write back the ones that
+    drifted, e.g. images of users, events or items removed by a cascading
+    delete. Returns the number of blobs updated.
+    """
+    uses = _uses()
+    result = await db.execute(
+        update(Blob)
+        .where(Blob.image_url.is_not(None), Blob.ref_count != uses)
+        .values(
+            ref_count=uses,
+            released_at=case(
+                (uses == 0, func.coalesce(Blob.released_at, datetime.now(timezone.utc))),
+                else_=None,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+async def collect_garbage(db: AsyncSession, grace_seconds: int, limit: int = 100) -> int:
+    """
+    Delete up to `limit` blobs that have been unreferenced for longer than
+    `grace_seconds`, objects first. References are re-checked so a stale
+    ref_count never removes an image in use; a blob whose objects could not
+    all be deleted is kept and retried on the next run. Returns the number
+    of blobs deleted.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+    result = await db.execute(
+        select(Blob)
+        .where(Blob.ref_count <= 0, Blob.released_at < cutoff, _uses() == 0)
+        .order_by(Blob.released_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    collected = 0
+    for blob in result.scalars().all():
+        deleted = await asyncio.gather(*(storage.delete_file(path) for path in blob.storage_paths or ()))
+        if all(deleted):
+            await db.delete(blob)
+            collected += 1
+    await db.flush()
+    return collected
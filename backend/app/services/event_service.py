@@ -1,28 +1,464 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from app.models.models import Participation, Event
+from sqlalchemy import select, insert, update, delete, and_, or_, exists, func, bindparam, literal, true, tuple_
+from sqlalchemy.orm import aliased
+from app.core.config import settings
+from app.db.session import on_commit, upsert_insert
+from app.models.models import Participation, Event, EventBuddy, User
+from app.services.principal_cache import principal_cache
 from fastapi import HTTPException
 
-async def register_for_event(db: AsyncSession, user_id: int, event_id: int):
-    # Check if already registered
+async def claim_seats(db: AsyncSession, event_id: int, seats: int = 1) -> Optional[int]:
+    """
+    Atomically take `seats` places on an event if its capacity allows.
+    The conditional UPDATE also locks the event row for the rest of the
+    transaction, so registrations for one event are serialized and
+    concurrent registrants always see each other in the buddies graph.
+    Returns the new registered_count, or None when the event is full;
+    404 if it does not exist.
+    """
     result = await db.execute(
-        select(Participation).where(
-            and_(Participation.user_id == user_id, Participation.event_id == event_id)
+        update(Event)
+        .where(
+            Event.id == event_id,
+            or_(Event.capacity == None, Event.registered_count + seats <= Event.capacity),
+        )
+        .values(registered_count=Event.registered_count + seats)
+        .returning(Event.registered_count)
+        .execution_options(synchronize_session=False)
+    )
+    registered_count = result.scalar_one_or_none()
+    if registered_count is not None:
+        return registered_count
+    exists_result = await db.execute(select(Event.id).where(Event.id == event_id))
+    if exists_result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return None
+
+async def register_for_event(db: AsyncSession, user_id: int, event_id: int):
+    registered_count = await claim_seats(db, event_id)
+    if registered_count is None:
+        registered = await db.execute(
+            select(Participation.id).where(
+                and_(Participation.user_id == user_id, Participation.event_id == event_id)
+            )
         )
+        if registered.scalar_one_or_none() is not None:
+            raise HTTPException(status_code=400, detail="Already registered for this event")
+        raise HTTPException(status_code=409, detail="Event is full")
+
+    # The unique (user_id, event_id) index decides duplicates; raising rolls
+    # back the seat claimed above
+    result = await db.execute(
+        upsert_insert(db, Participation)
+        .values(user_id=user_id, event_id=event_id, status="registered")
+        .on_conflict_do_nothing(index_elements=["user_id", "event_id"])
+        .returning(Participation)
     )
-    existing = result.scalar_one_or_none()
-    if existing:
+    participation = result.scalar_one_or_none()
+    if participation is None:
         raise HTTPException(status_code=400, detail="Already registered for this event")
-    
-    participation = Participation(user_id=user_id, event_id=event_id)
-    db.add(participation)
-    await db.commit()
-    await db.refresh(participation)
+
+    # Keep the profile counters current without recounting participations
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(events_count=func.coalesce(User.events_count, 0) + 1)
+    )
+    await add_co_attendance(db, event_id, [user_id], registered_count)
+    on_commit(db, principal_cache.invalidate, user_id)
     return participation
 
+async def bulk_register(db: AsyncSession, event_id: int, user_ids: List[int]) -> Dict[int, str]:
+    """
+    Register many users at once with a fixed number of statements.
+    Returns an outcome per user id: "registered", "already_registered",
+    "event_full" (capacity ran out, in request order) or "user_not_found".
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    result = await db.execute(
+        select(Event.capacity, Event.registered_count)
+        .where(Event.id == event_id)
+        .with_for_update()
+    )
+    event = result.one_or_none()
+    if event is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    known = set((await db.execute(select(User.id).where(User.id.in_(user_ids)))).scalars())
+    registered = set((await db.execute(
+        select(Participation.user_id)
+        .where(Participation.event_id == event_id, Participation.user_id.in_(user_ids))
+    )).scalars())
+
+    outcomes = {}
+    candidates = []
+    for user_id in user_ids:
+        if user_id not in known:
+            outcomes[user_id] = "user_not_found"
+        elif user_id in registered:
+            outcomes[user_id] = "already_registered"
+        else:
+            candidates.append(user_id)
+    if event.capacity is not None:
+        seats = max(event.capacity - event.registered_count, 0)
+        for user_id in candidates[seats:]:
+            outcomes[user_id] = "event_full"
+        candidates = candidates[:seats]
+
+    new_ids = []
+    if candidates:
+        result = await db.execute(
+            upsert_insert(db, Participation)
+            .values([
+                {"user_id": user_id, "event_id": event_id, "status": "registered"}
+                for user_id in candidates
+            ])
+            .on_conflict_do_nothing(index_elements=["user_id", "event_id"])
+            .returning(Participation.user_id)
+        )
+        new_ids = list(result.scalars())
+    # Anything not inserted was registered concurrently outside the event lock
+    for user_id in candidates:
+        outcomes[user_id] = "already_registered"
+    for user_id in new_ids:
+        outcomes[user_id] = "registered"
+
+    if new_ids:
+        result = await db.execute(
+            update(Event)
+            .where(Event.id == event_id)
+            .values(registered_count=Event.registered_count + len(new_ids))
+            .returning(Event.registered_count)
+            .execution_options(synchronize_session=False)
+        )
+        registered_count = result.scalar_one()
+        await db.execute(
+            update(User)
+            .where(User.id.in_(new_ids))
+            .values(events_count=func.coalesce(User.events_count, 0) + 1)
+            .execution_options(synchronize_session=False)
+        )
+        await add_co_attendance(db, event_id, new_ids, registered_count)
+        on_commit(db, principal_cache.invalidate_many, new_ids)
+    return {user_id: outcomes[user_id] for user_id in user_ids}
+
+async def bulk_check_in(db: AsyncSession, event_id: int, user_ids: List[int]) -> Dict[int, str]:
+    """
+    Mark many registered participants as attended in one UPDATE.
+    Returns an outcome per user id: "checked_in", "already_checked_in" or
+    "not_registered" (including cancelled registrations).
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    result = await db.execute(
+        update(Participation)
+        .where(
+            Participation.event_id == event_id,
+            Participation.user_id.in_(user_ids),
+            Participation.status == "registered",
+        )
+        .values(status="attended")
+        .returning(Participation.user_id)
+        .execution_options(synchronize_session=False)
+    )
+    checked_in = set(result.scalars())
+
+    attended = set()
+    rest = [user_id for user_id in user_ids if user_id not in checked_in]
+    if rest:
+        result = await db.execute(
+            select(Participation.user_id).where(
+                Participation.event_id == event_id,
+                Participation.user_id.in_(rest),
+                Participation.status == "attended",
+            )
+        )
+        attended = set(result.scalars())
+
+    return {
+        user_id: "checked_in" if user_id in checked_in
+        else "already_checked_in" if user_id in attended
+        else "not_registered"
+        for user_id in user_ids
+    }
+
 async def get_user_participations(db: AsyncSession, user_id: int):
     result = await db.execute(
         select(Event).join(Participation).where(Participation.user_id == user_id)
     )
     return result.scalars().all()
+
+def _attendee_pairs(
+    event_id: int, user_ids: Optional[List[int]] = None, exclude: Optional[List[int]] = None
+):
+    """
+    (user_id, buddy_id) for every ordered pair of attendees of an event,
+    optionally only the pairs that involve one of `user_ids`, or none of
+    `exclude`.
+    """
+    mine = aliased(Participation)
+    theirs = aliased(Participation)
+    query = (
+        select(mine.user_id, theirs.user_id.label("buddy_id"))
+        .join(theirs, and_(theirs.event_id == mine.event_id, theirs.user_id != mine.user_id))
+        .where(mine.event_id == event_id)
+    )
+    if user_ids is not None:
+        query = query.where(or_(mine.user_id.in_(user_ids), theirs.user_id.in_(user_ids)))
+    if exclude:
+        query = query.where(mine.user_id.not_in(exclude), theirs.user_id.not_in(exclude))
+    return query
+
+async def _add_buddies_count(db: AsyncSession, counts: List[tuple]):
+    """
+    Apply (user_id, delta) changes to users.buddies_count; the cached
+    principals of those users are invalidated once the change commits
+    """
+    if not counts:
+        return
+    users = User.__table__
+    await db.execute(
+        update(users)
+        .where(users.c.id == bindparam("uid"))
+        .values(buddies_count=func.coalesce(users.c.buddies_count, 0) + bindparam("delta")),
+        [{"uid": user_id, "delta": delta} for user_id, delta in counts]
+    )
+    on_commit(db, principal_cache.invalidate_many, [user_id for user_id, _ in counts])
+
+def _in_buddy_graph(registered_count: int) -> bool:
+    """
+    Only events with at most BUDDY_GRAPH_MAX_EVENT_SIZE registrations count
+    as co-attendance: pairs grow quadratically with attendance, and sharing a
+    campus-wide event says little about who you know. An event leaves the
+    graph when registrations take it over the limit, and rejoins it if
+    deleted users bring it back under (see remove_users).
+    """
+    return registered_count <= settings.BUDDY_GRAPH_MAX_EVENT_SIZE
+
+async def add_co_attendance(
+    db: AsyncSession, event_id: int, user_ids: List[int], registered_count: int
+):
+    """
+    Update the event_buddies graph after `user_ids` registered for an event,
+    bringing it to `registered_count`: every attendee pair involving one of
+    them gains a shared event. The caller holds the event row lock
+    (claim_seats) and has inserted the participations.
+    """
+    if not _in_buddy_graph(registered_count):
+        if _in_buddy_graph(registered_count - len(user_ids)):
+            # The event just outgrew the graph: take back what it contributed
+            await _discount_pairs(db, _attendee_pairs(event_id, exclude=user_ids))
+        return
+
+    await _count_pairs(db, _attendee_pairs(event_id, user_ids))
+
+async def _count_pairs(db: AsyncSession, pairs):
+    """Add one shared event to each (user_id, buddy_id) pair selected by `pairs`"""
+    pairs = pairs.subquery()
+
+    # Pairs seen for the first time raise both users' buddies_count
+    result = await db.execute(
+        select(pairs.c.user_id, func.count())
+        .where(~exists().where(
+            EventBuddy.user_id == pairs.c.user_id, EventBuddy.buddy_id == pairs.c.buddy_id
+        ))
+        .group_by(pairs.c.user_id)
+    )
+    await _add_buddies_count(db, result.all())
+
+    stmt = upsert_insert(db, EventBuddy).from_select(
+        ["user_id", "buddy_id", "shared_events"],
+        # WHERE keeps SQLite from parsing ON CONFLICT as part of the SELECT
+        select(pairs.c.user_id, pairs.c.buddy_id, literal(1)).where(true()),
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["user_id", "buddy_id"],
+        set_={"shared_events": EventBuddy.shared_events + 1},
+    ))
+
+async def remove_event_attendance(db: AsyncSession, event_id: int):
+    """
+    Undo an event's contribution to the profile counters and the buddies
+    graph; call before deleting the event (its participations cascade).
+    """
+    result = await db.execute(select(Event.registered_count).where(Event.id == event_id))
+    if _in_buddy_graph(result.scalar_one_or_none() or 0):
+        await _discount_pairs(db, _attendee_pairs(event_id))
+    result = await db.execute(
+        update(User)
+        .where(User.id.in_(select(Participation.user_id).where(Participation.event_id == event_id)))
+        .values(events_count=func.coalesce(User.events_count, 1) - 1)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    on_commit(db, principal_cache.invalidate_many, list(result.scalars()))
+
+async def remove_users(db: AsyncSession, user_ids: List[int], event_ids: List[int] = ()):
+    """
+    Undo what `user_ids` contributed before they are deleted along with
+    `event_ids` (their participations and organized events cascade). Deleted
+    events are removed as by remove_event_attendance; on every other event
+    the users attended, their seats are given back and their pairs leave
+    the buddies graph.
+    """
+    organized = await db.execute(select(Event.id).where(Event.organizer_id.in_(user_ids)))
+    deleted_events = sorted(set(event_ids) | set(organized.scalars()))
+    for event_id in deleted_events:
+        await remove_event_attendance(db, event_id)
+
+    result = await db.execute(
+        select(Participation.event_id, func.count())
+        .where(Participation.user_id.in_(user_ids), Participation.event_id.not_in(deleted_events))
+        .group_by(Participation.event_id)
+        .order_by(Participation.event_id)
+    )
+    for event_id, leaving in result.all():
+        result = await db.execute(
+            update(Event)
+            .where(Event.id == event_id)
+            .values(registered_count=Event.registered_count - leaving)
+            .returning(Event.registered_count)
+            .execution_options(synchronize_session=False)
+        )
+        registered_count = result.scalar_one()
+        if _in_buddy_graph(registered_count + leaving):
+            await _discount_pairs(db, _attendee_pairs(event_id, user_ids))
+        elif _in_buddy_graph(registered_count):
+            # Back under the limit: the remaining attendees rejoin the graph
+            await _count_pairs(db, _attendee_pairs(event_id, exclude=user_ids))
+
+async def _discount_pairs(db: AsyncSession, pairs):
+    """
+    Take one shared event off each (user_id, buddy_id) pair selected by
+    `pairs`. Every statement is restricted to those pairs, probing the
+    primary key, so the cost scales with the event, not with the graph.
+    """
+    pairs = pairs.subquery()
+    in_event = tuple_(EventBuddy.user_id, EventBuddy.buddy_id).in_(
+        select(pairs.c.user_id, pairs.c.buddy_id)
+    )
+    await db.execute(
+        update(EventBuddy)
+        .where(in_event)
+        .values(shared_events=EventBuddy.shared_events - 1)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(
+        select(EventBuddy.user_id, -func.count())
+        .where(in_event, EventBuddy.shared_events <= 0)
+        .group_by(EventBuddy.user_id)
+    )
+    await _add_buddies_count(db, result.all())
+    await db.execute(
+        delete(EventBuddy)
+        .where(in_event, EventBuddy.shared_events <= 0)
+        .execution_options(synchronize_session=False)
+    )
+
+async def rebuild_buddy_graph(db: AsyncSession) -> int:
+    """
+    Recompute event_buddies and buddies_count from participations under the
+    current BUDDY_GRAPH_MAX_EVENT_SIZE, e.g. after changing the setting.
+    Returns the number of pairs. Cached principals keep their old
+    buddies_count until principal_cache is cleared or they expire.
+    """
+    mine = aliased(Participation)
+    theirs = aliased(Participation)
+    await db.execute(delete(EventBuddy).execution_options(synchronize_session=False))
+    result = await db.execute(
+        insert(EventBuddy).from_select(
+            ["user_id", "buddy_id", "shared_events"],
+            select(mine.user_id, theirs.user_id, func.count())
+            .join(theirs, and_(theirs.event_id == mine.event_id, theirs.user_id != mine.user_id))
+            .join(Event, Event.id == mine.event_id)
+            .where(_in_buddy_graph(Event.registered_count))
+            .group_by(mine.user_id, theirs.user_id)
+        )
+    )
+    await db.execute(
+        update(User)
+        .values(buddies_count=select(func.count()).where(EventBuddy.user_id == User.id).scalar_subquery())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+async def get_top_buddies(db: AsyncSession, user_id: int, limit: int = 20):
+    """The users `user_id` attended the most events with"""
+    result = await db.execute(
+        select(
+            User.id, User.full_name, User.profile_image_url, User.profile_image_variants,
+            EventBuddy.shared_events
+        )
+        .join(User, User.id == EventBuddy.buddy_id)
+        .where(EventBuddy.user_id == user_id)
+        .order_by(EventBuddy.shared_events.desc(), EventBuddy.buddy_id)
+        .limit(limit)
+    )
+    return result.mappings().all()
+
+async def get_buddy_suggestions(db: AsyncSession, user_id: int, limit: int = 20, fan_out: int = 50):
+    """
+    "People you may know": buddies of the user's `fan_out` closest buddies
+    who are not buddies yet, ranked by the number of mutual buddies.
+    """
+    closest = (
+        select(EventBuddy.buddy_id)
+        .where(EventBuddy.user_id == user_id)
+        .order_by(EventBuddy.shared_events.desc(), EventBuddy.buddy_id)
+        .limit(fan_out)
+        .subquery()
+    )
+    known = aliased(EventBuddy)
+    candidate = aliased(EventBuddy)
+    mutual = func.count().label("mutual_buddies")
+    # Rank on ids first; user columns are joined to the `limit` winners only
+    ranked = (
+        select(candidate.buddy_id, mutual)
+        .join(closest, candidate.user_id == closest.c.buddy_id)
+        .where(
+            candidate.buddy_id != user_id,
+            ~exists().where(known.user_id == user_id, known.buddy_id == candidate.buddy_id),
+        )
+        .group_by(candidate.buddy_id)
+        .order_by(mutual.desc(), candidate.buddy_id)
+        .limit(limit)
+        .subquery()
+    )
+    result = await db.execute(
+        select(
+            User.id, User.full_name, User.profile_image_url, User.profile_image_variants,
+            ranked.c.mutual_buddies
+        )
+        .join(ranked, User.id == ranked.c.buddy_id)
+        .order_by(ranked.c.mutual_buddies.desc(), User.id)
+    )
+    return result.mappings().all()
+
+async def recompute_user_counters(db: AsyncSession) -> int:
+    """
+    Recount events_count and buddies_count for every user and write back the
+    rows that drifted (e.g. after users were deleted). Returns the ids of
+    the users updated.
+    """
+    events_count = (
+        select(func.count(Participation.id))
+        .where(Participation.user_id == User.id)
+        .scalar_subquery()
+    )
+    buddies_count = (
+        select(func.count())
+        .select_from(EventBuddy)
+        .where(EventBuddy.user_id == User.id)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(User)
+        .where(
+            (func.coalesce(User.events_count, -1) != events_count)
+            | (func.coalesce(User.buddies_count, -1) != buddies_count)
+        )
+        .values(events_count=events_count, buddies_count=buddies_count)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(result.scalars())
@@ -0,0 +1,129 @@
+"""Resize and re-encode uploaded images into WebP variants off the event loop"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.services import blob_service
+from app.utils.images import Image, InvalidImage, render_variants
+from app.utils.storage import storage
+from app.utils.uploads import ReceivedFile
+
+# Variant name -> longest side in pixels. List views use "thumb", cards and
+# previews "card"; "full" replaces the original as the image_url.
+IMAGE_VARIANTS = {"thumb": 160, "card": 640, "full": 1600}
+
+
+class ImagePipeline:
+    """
+    Decoding and resizing a phone photo is CPU-bound for tens to hundreds of
+    milliseconds, so it runs in a pool of worker processes rather than
+    threads (Pillow's resampling holds the GIL for part of the work). The
+    pool is started on first use with the "spawn" method, as forking a
+    process that runs thread pools is unsafe.
+    """
+
+    def __init__(self, workers: int = None, quality: int = None):
+        self.workers = settings.IMAGE_PROCESS_WORKERS if workers is None else workers
+        self.quality = quality or settings.IMAGE_WEBP_QUALITY
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+        self.processed = 0
+        self.rejected = 0
+        self.deduplicated = 0
+        self.render_time_total = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        """False when Pillow is not installed or IMAGE_PROCESS_WORKERS is 0"""
+        return Image is not None and self.workers > 0
+
+    async def render(self, path) -> Dict[str, bytes]:
+        """Render every variant of the image at `path`; raises InvalidImage"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        started = time.perf_counter()
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, render_variants, str(path), IMAGE_VARIANTS, self.quality
+            )
+        except InvalidImage:
+            self.rejected += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.processed += 1
+            self.render_time_total += time.perf_counter() - started
+
+    async def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "rejected": self.rejected,
+            "deduplicated": self.deduplicated,
+            "render_time_avg_ms": round(self.render_time_total / self.processed * 1000, 2) if self.processed else None,
+        }
+
+
+image_pipeline = ImagePipeline()
+
+
+async def store_image(db: AsyncSession, upload: ReceivedFile) -> Tuple[str, Optional[Dict[str, str]]]:
+    """
+    Store an uploaded image once per distinct content and return
+    (image_url, variant URLs). The caller's row takes a reference on the
+    blob; release the URL it replaces with blob_service.release.
+
+    If the same file was stored before, this only bumps the blob's reference
+    count: nothing is rendered or uploaded. Otherwise the image is rendered
+    and the image_url is the "full" variant; without the pipeline the
+    original is stored as-is and there are no variants. Raises 400 for
+    files Pillow cannot decode and 502 if storage fails.
+    """
+    async with blob_service.claim(upload.sha256, upload.size) as blob:
+        if blob.image_url is None:
+            await _store_blob(blob, upload)
+        else:
+            image_pipeline.deduplicated += 1
+    await blob_service.acquire(db, upload.sha256)
+    return blob.image_url, blob.image_variants
+
+
+async def _store_blob(blob, upload: ReceivedFile):
+    """Write the objects of a new blob; on failure, delete whatever was written"""
+    stem = storage.blob_stem(upload.sha256)
+    if not image_pipeline.enabled:
+        storage_path = f"{stem}{upload.ext}"
+        image_url = await storage.save(storage_path, upload.path, upload.ext)
+        if image_url is None:
+            raise HTTPException(status_code=502, detail="Image upload failed")
+        blob.image_url, blob.storage_paths = image_url, [storage_path]
+        return
+
+    try:
+        rendered = await image_pipeline.render(upload.path)
+    except InvalidImage:
+        raise HTTPException(status_code=400, detail="Invalid image file")
+    storage_paths = [f"{stem}_{name}.webp" for name in rendered]
+    variants = await storage.save_image_variants(stem, rendered)
+    if variants is None:
+        # Some variants may have been written; the blob row is rolled back
+        await asyncio.gather(*(storage.delete_file(path) for path in storage_paths))
+        raise HTTPException(status_code=502, detail="Image upload failed")
+    blob.image_url, blob.image_variants = variants["full"], variants
+    blob.storage_paths = storage_paths
@@ -0,0 +1,173 @@
+"""Bounded cache of the most recent messages of each chat channel"""
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+# Fields kept per message; matches the chat Message response schema
+MESSAGE_FIELDS = ("id", "sender_id", "sender_name", "content", "channel", "timestamp")
+
+
+def _to_entry(message) -> dict:
+    if isinstance(message, dict):
+        entry = {field: message.get(field) for field in MESSAGE_FIELDS}
+    else:
+        entry = {field: getattr(message, field, None) for field in MESSAGE_FIELDS}
+    if isinstance(entry["timestamp"], datetime):
+        entry["timestamp"] = entry["timestamp"].isoformat()
+    return entry
+
+
+class RecentMessageCache:
+    """
+    Ring buffer of the newest `capacity` messages per channel, newest first.
+
+    A channel is only served from the cache once it has been primed from the
+    database; afterwards the message writer appends every persisted message.
+    Each channel has a generation counter that is bumped on append, so a prime
+    that raced with a new message is discarded rather than losing it.
+
+    The "local" backend is per process: a worker only appends the messages
+    it wrote itself, so its buffers expire `local_ttl` seconds after being
+    primed to bound how stale they get next to other workers. Use the
+    "redis" backend when several workers write chat messages, so every
+    worker sees the same buffer.
+    """
+
+    def __init__(self, capacity: int = None, backend: str = None, local_ttl: float = None):
+        self.capacity = capacity or settings.CHAT_CACHE_SIZE
+        self.backend = backend or settings.CHAT_CACHE_BACKEND
+        self.local_ttl = settings.CHAT_CACHE_LOCAL_TTL_SECONDS if local_ttl is None else local_ttl
+        self.buffers: Dict[str, Deque[dict]] = {}
+        self.generations: Dict[str, int] = {}
+        # channel -> monotonic time its local buffer was primed
+        self.primed_at: Dict[str, float] = {}
+        if self.backend == "local" and settings.WS_BACKPLANE == "redis":
+            logger.warning(
+                "WS_BACKPLANE=redis with CHAT_CACHE_BACKEND=local; chat history "
+                "may lag other workers by up to CHAT_CACHE_LOCAL_TTL_SECONDS. "
+                "Set CHAT_CACHE_BACKEND=redis when running several workers."
+            )
+        self.hits = 0
+        self.misses = 0
+
+    async def get_recent(self, channel: str, limit: int) -> Tuple[Optional[List[dict]], int]:
+        """
+        Return (messages, generation). messages is None on a miss; pass the
+        generation to prime() after loading the page from the database.
+        """
+        if self.backend == "redis":
+            messages, generation = await self._redis_get(channel, limit)
+        else:
+            buffer = self.buffers.get(channel)
+            if buffer is not None and time.monotonic() - self.primed_at[channel] > self.local_ttl:
+                # Expired: reload from the database (see class docstring)
+                del self.buffers[channel]
+                buffer = None
+            messages = list(buffer)[:limit] if buffer is not None else None
+            generation = self.generations.get(channel, 0)
+
+        if messages is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return messages, generation
+
+    async def prime(self, channel: str, messages: list, generation: int):
+        """Fill a channel's buffer with its newest messages (newest first)"""
+        entries = [_to_entry(m) for m in messages[:self.capacity]]
+        if self.backend == "redis":
+            await self._redis_prime(channel, entries, generation)
+            return
+        if self.generations.get(channel, 0) != generation:
+            return
+        self.buffers[channel] = deque(entries, maxlen=self.capacity)
+        self.primed_at[channel] = time.monotonic()
+
+    async def append(self, messages: list):
+        """Add newly persisted messages (oldest first) to their primed channels"""
+        entries = [_to_entry(m) for m in messages]
+        if self.backend == "redis":
+            await self._redis_append(entries)
+            return
+        for entry in entries:
+            channel = entry["channel"]
+            self.generations[channel] = self.generations.get(channel, 0) + 1
+            buffer = self.buffers.get(channel)
+            if buffer is not None:
+                buffer.appendleft(entry)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "channels": len(self.buffers) if self.backend == "local" else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    # Redis tier: one list per channel (newest first) plus a generation key.
+    # Appends use LPUSHX so they only touch channels that have been primed.
+
+    def _keys(self, channel: str) -> Tuple[str, str]:
+        key = f"chat:recent:{channel}"
+        return key, f"{key}:gen"
+
+    async def _redis_get(self, channel: str, limit: int) -> Tuple[Optional[List[dict]], int]:
+        from app.utils.redis import redis_client
+        key, gen_key = self._keys(channel)
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.exists(key)
+                pipe.lrange(key, 0, limit - 1)
+                pipe.get(gen_key)
+                exists, raw, generation = await pipe.execute()
+        except Exception:
+            logger.exception("Message cache error")
+            return None, -1
+        messages = [json.loads(item) for item in raw] if exists else None
+        return messages, int(generation or 0)
+
+    async def _redis_prime(self, channel: str, entries: List[dict], generation: int):
+        from redis.exceptions import WatchError
+        from app.utils.redis import redis_client
+        key, gen_key = self._keys(channel)
+        if generation < 0 or not entries:
+            return
+        try:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                await pipe.watch(gen_key)
+                if int(await pipe.get(gen_key) or 0) != generation:
+                    return
+                pipe.multi()
+                pipe.delete(key)
+                pipe.rpush(key, *[dumps(entry) for entry in entries])
+                await pipe.execute()
+        except WatchError:
+            pass
+        except Exception:
+            logger.exception("Message cache error")
+
+    async def _redis_append(self, entries: List[dict]):
+        from app.utils.redis import redis_client
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for entry in entries:
+                    key, gen_key = self._keys(entry["channel"])
+                    pipe.incr(gen_key)
+                    pipe.lpushx(key, dumps(entry))
+                    pipe.ltrim(key, 0, self.capacity - 1)
+                await pipe.execute()
+        except Exception:
+            logger.exception("Message cache error")
+
+
+message_cache = RecentMessageCache()
@@ -0,0 +1,149 @@
+"""Background writer that batches chat message inserts from all websockets"""
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, mark_recent_write
+from app.models.models import Message
+from app.services.message_cache import message_cache
+
+logger = logging.getLogger(__name__)
+
+# Keys of a queued record that map to columns; anything else (e.g. sender_name)
+# is display data that is only passed on to the recent-message cache
+MESSAGE_COLUMNS = {column.key for column in Message.__table__.columns}
+
+
+class MessageWriter:
+    """
+    Coalesces chat messages into multi-row INSERTs.
+
+    A batch is flushed as soon as `batch_size` messages are pending or
+    `flush_interval_ms` has passed since the first one arrived, whichever
+    comes first. Each flush is a single INSERT ... RETURNING and one commit;
+    a failing batch is split until the rows at fault are isolated.
+    """
+
+    def __init__(self, batch_size: int = None, flush_interval_ms: int = None, max_pending: int = 10000):
+        self.batch_size = batch_size or settings.CHAT_WRITE_BATCH_SIZE
+        self.flush_interval = (flush_interval_ms or settings.CHAT_WRITE_FLUSH_MS) / 1000
+        self.max_pending = max_pending
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.written = 0
+        self.failed = 0
+
+    async def start(self):
+        if self._task is None:
+            # A queue is bound to the event loop it is first used on
+            self.queue = asyncio.Queue(maxsize=self.max_pending)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still pending and stop the writer"""
+        if self._task is not None:
+            await self.queue.put(None)
+            await self._task
+            self._task = None
+
+    async def write(self, values: dict, wait: bool = False) -> Optional[int]:
+        """
+        Queue a message row for insertion.
+
+        With wait=True the call returns the new message id once the batch
+        containing it has been committed; otherwise it returns immediately.
+        """
+        future = asyncio.get_running_loop().create_future() if wait else None
+        await self.queue.put((values, future))
+        if future is not None:
+            return await future
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.queue.qsize(),
+            "flushes": self.flushes,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[dict, Optional[asyncio.Future]]]):
+        written = await self._insert(batch)
+        if not written:
+            return
+
+        # Persisted messages now have ids; make them visible to history reads
+        for (values, _), _ in written:
+            mark_recent_write(values["sender_id"])
+        await message_cache.append([
+            {**values, "id": message_id} for (values, _), message_id in written
+        ])
+
+    async def _insert(self, batch: List[Tuple[dict, Optional[asyncio.Future]]]) -> list:
+        """
+        Insert `batch` in one statement and resolve its futures; returns the
+        written (item, message_id) pairs. If the INSERT fails, the batch is
+        retried in halves so that only the offending rows (e.g. a sender
+        deleted while still connected) fail instead of the whole batch.
+        """
+        rows = [
+            {key: value for key, value in values.items() if key in MESSAGE_COLUMNS}
+            for values, _ in batch
+        ]
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    insert(Message).returning(Message.id, sort_by_parameter_order=True),
+                    rows
+                )
+                ids = result.scalars().all()
+                await db.commit()
+        except Exception as e:
+            if len(batch) > 1:
+                middle = len(batch) // 2
+                return await self._insert(batch[:middle]) + await self._insert(batch[middle:])
+            self.failed += 1
+            logger.exception("Message writer failed to insert a message")
+            _, future = batch[0]
+            if future is not None and not future.done():
+                future.set_exception(e)
+            return []
+
+        self.flushes += 1
+        self.written += len(batch)
+        for (_, future), message_id in zip(batch, ids):
+            if future is not None and not future.done():
+                future.set_result(message_id)
+        return list(zip(batch, ids))
+
+message_writer = MessageWriter()
@@ -0,0 +1,117 @@
+"""Short-lived cache of authenticated users, keyed by user id"""
+import logging
+import json
+from typing import Optional
+
+from app.core.config import settings
+from app.models.models import User
+from app.utils.cache import TTLCache
+from app.utils.encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+# Column values of the users row; enough to rebuild a User without a query.
+# The password hash is left out: auth never needs it from the cache.
+USER_COLUMNS = [
+    column.key for column in User.__table__.columns if column.key != "hashed_password"
+]
+
+
+class PrincipalCache:
+    """
+    Caches a snapshot of the users row behind each authenticated request.
+
+    Entries live for PRINCIPAL_CACHE_TTL_SECONDS and are invalidated by the
+    endpoints that change a user. The "redis" backend adds a shared tier so a
+    worker can reuse a principal loaded by another one; each worker still keeps
+    its own in-process tier, so a change made on another worker can be seen
+    late by at most the TTL.
+    """
+
+    def __init__(self, maxsize: int = None, ttl: int = None, backend: str = None):
+        self.ttl = ttl if ttl is not None else settings.PRINCIPAL_CACHE_TTL_SECONDS
+        self.backend = backend or settings.PRINCIPAL_CACHE_BACKEND
+        self.local = TTLCache(maxsize or settings.PRINCIPAL_CACHE_SIZE, self.ttl)
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    @staticmethod
+    def snapshot(user: User) -> dict:
+        return {key: getattr(user, key) for key in USER_COLUMNS}
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        snapshot = self.local.get(user_id)
+        if snapshot is not None or self.backend != "redis":
+            return snapshot
+
+        from app.utils.redis import redis_client
+        try:
+            raw = await redis_client.get(self._key(user_id))
+        except Exception:
+            logger.exception("Principal cache error")
+            return None
+        if raw is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        snapshot = json.loads(raw)
+        self.local.set(user_id, snapshot)
+        return snapshot
+
+    async def set(self, user_id: int, snapshot: dict):
+        self.local.set(user_id, snapshot)
+        if self.backend == "redis":
+            from app.utils.redis import redis_client
+            try:
+                await redis_client.set(self._key(user_id), dumps(snapshot), ex=self.ttl)
+            except Exception:
+                logger.exception("Principal cache error")
+
+    async def invalidate(self, user_id: int):
+        self.local.delete(user_id)
+        if self.backend == "redis":
+            from app.utils.redis import redis_client
+            try:
+                await redis_client.delete(self._key(user_id))
+            except Exception:
+                logger.exception("Principal cache error")
+
+    async def invalidate_many(self, user_ids):
+        """Invalidate several users at once, e.g. everyone whose counters changed"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        for user_id in user_ids:
+            self.local.delete(user_id)
+        if self.backend == "redis":
+            from app.utils.redis import redis_client
+            try:
+                await redis_client.delete(*(self._key(user_id) for user_id in user_ids))
+            except Exception:
+                logger.exception("Principal cache error")
+
+    async def clear(self):
+        """Drop every cached principal (e.g. after a bulk delete)"""
+        self.local.clear()
+        if self.backend == "redis":
+            from app.utils.redis import redis_client
+            try:
+                keys = [key async for key in redis_client.scan_iter(match=self._key("*"))]
+                if keys:
+                    await redis_client.delete(*keys)
+            except Exception:
+                logger.exception("Principal cache error")
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "local": self.local.stats(),
+            "redis_hits": self.redis_hits if self.backend == "redis" else None,
+            "redis_misses": self.redis_misses if self.backend == "redis" else None,
+        }
+
+    def _key(self, user_id) -> str:
+        return f"auth:principal:{user_id}"
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+import hashlib
+import secrets
+import uuid
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.models import RefreshToken, User
+
+# Refresh tokens are opaque random strings; only their SHA-256 digest is stored.
+# Renewing a session is a lookup + rotation instead of a bcrypt verification.
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+async def issue_refresh_token(
+    db: AsyncSession, user_id: int, family_id: Optional[str] = None
+) -> Tuple[str, RefreshToken]:
+    token = secrets.token_urlsafe(32)
+    db_obj = RefreshToken(
+        user_id=user_id,
+        token_hash=_hash_token(token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    db.add(db_obj)
+    await db.flush()
+    return token, db_obj
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> Tuple[int, str]:
+    """
+    Exchange a refresh token for a new one of the same family.
+    Presenting a token that was already rotated or revoked means it may have
+    been stolen, so the whole family is revoked.
+    """
+    result = await db.execute(
+        select(RefreshToken)
+        .where(RefreshToken.token_hash == _hash_token(token))
+        .with_for_update()
+    )
+    current = result.scalar_one_or_none()
+    if not current:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    now = datetime.now(timezone.utc)
+    if current.revoked_at is not None:
+        await _revoke_family_now(current.family_id, now)
+        raise HTTPException(status_code=401, detail="Refresh token has been revoked")
+    expires_at = current.expires_at
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if expires_at <= now:
+        raise HTTPException(status_code=401, detail="Refresh token has expired")
+
+    user_result = await db.execute(select(User.is_active).where(User.id == current.user_id))
+    is_active = user_result.scalar_one_or_none()
+    if not is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+
+    new_token, new_obj = await issue_refresh_token(db, current.user_id, current.family_id)
+    current.revoked_at = now
+    current.replaced_by_id = new_obj.id
+    return current.user_id, new_token
+
+async def revoke_refresh_token(db: AsyncSession, token: str):
+    """Revoke a refresh token and every rotation of it (logout)"""
+    result = await db.execute(
+        select(RefreshToken.family_id).where(RefreshToken.token_hash == _hash_token(token))
+    )
+    family_id = result.scalar_one_or_none()
+    if family_id:
+        await _revoke_family(db, family_id, datetime.now(timezone.utc))
+
+async def revoke_user_refresh_tokens(db: AsyncSession, user_id: int):
+    """Revoke all of a user's sessions, e.g. after a password change"""
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at == None)
+        .values(revoked_at=datetime.now(timezone.utc))
+    )
+
+async def _revoke_family_now(family_id: str, now: datetime):
+    """
+    Revoke a family in a transaction of its own. The request fails with 401
+    and its unit of work is rolled back, but the revocation must stick.
+    """
+    async with AsyncSessionLocal() as session:
+        await _revoke_family(session, family_id, now)
+        await session.commit()
+
+async def _revoke_family(db: AsyncSession, family_id: str, now: datetime):
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at == None)
+        .values(revoked_at=now)
+    )
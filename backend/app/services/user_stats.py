@@ -0,0 +1,74 @@
+"""Periodic reconciliation of the users.events_count / buddies_count counters"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.services import event_service
+from app.services.principal_cache import principal_cache
+
+logger = logging.getLogger(__name__)
+
+
+class UserStatsRefresher:
+    """
+    Recomputes the profile counters in the background. Both are maintained
+    inline on registration and event deletion; this catches drift from paths
+    that bypass the service, such as cascading user or college deletes.
+    """
+
+    def __init__(self, interval_seconds: int = None):
+        self.interval = settings.USER_STATS_REFRESH_SECONDS if interval_seconds is None else interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.failed = 0
+        self.updated = 0
+        self.last_duration_ms: Optional[float] = None
+
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def refresh(self) -> int:
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            user_ids = await event_service.recompute_user_counters(db)
+            await db.commit()
+        await principal_cache.invalidate_many(user_ids)
+        updated = len(user_ids)
+        self.runs += 1
+        self.updated += updated
+        self.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        return updated
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "failed": self.failed,
+            "users_updated": self.updated,
+            "last_duration_ms": self.last_duration_ms,
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                self.failed += 1
+                logger.exception("User stats refresh failed")
+            await asyncio.sleep(self.interval)
+
+
+user_stats_refresher = UserStatsRefresher()
@@ -0,0 +1,27 @@
+"""JSON encoding helpers for payloads that are sent to many recipients"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(payload: Any) -> str:
+    """
+    Serialize a payload to a JSON string.
+
+    Uses orjson when it is installed, otherwise the standard library
+    with the same compact separators Starlette's send_json uses.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload).decode("utf-8")
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def encode_message(message: Union[dict, str]) -> str:
+    """Encode a message once so it can be fanned out without re-serializing"""
+    if isinstance(message, str):
+        return message
+    return dumps(message)
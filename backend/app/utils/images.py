@@ -0,0 +1,44 @@
+"""
+Image variant rendering. Runs in the worker processes of
+services/image_pipeline.py, so this module only depends on Pillow.
+"""
+from io import BytesIO
+from typing import Dict
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def render_variants(path: str, sizes: Dict[str, int], quality: int) -> Dict[str, bytes]:
+    """
+    Decode the image at `path` once and encode one WebP per entry of `sizes`
+    (variant name -> longest side in pixels). Images are never upscaled and
+    EXIF orientation is applied, since WebP output carries no EXIF.
+    """
+    try:
+        with Image.open(path) as source:
+            # JPEG: let the decoder downscale by a power of two while decoding
+            largest = max(sizes.values())
+            source.draft("RGB", (largest, largest))
+            image = ImageOps.exif_transpose(source)
+            if image.mode not in ("RGB", "RGBA"):
+                has_alpha = "A" in image.getbands() or "transparency" in image.info
+                image = image.convert("RGBA" if has_alpha else "RGB")
+
+            variants = {}
+            # Largest first, each variant resampled from the previous one
+            for name, size in sorted(sizes.items(), key=lambda item: -item[1]):
+                image.thumbnail((size, size), Image.LANCZOS)
+                buffer = BytesIO()
+                image.save(buffer, "WEBP", quality=quality, method=4)
+                variants[name] = buffer.getvalue()
+            return variants
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e)) from None
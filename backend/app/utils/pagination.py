@@ -0,0 +1,51 @@
+"""Opaque cursors for keyset (seek) pagination"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+# Response header carrying the cursor for the next (older) page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last row of a page, e.g. (timestamp, id)"""
+    raw = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """Decode a cursor produced by encode_cursor, checking it has the expected shape"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(raw, list) or len(raw) != len(types):
+            raise ValueError("cursor length mismatch")
+        return [datetime.fromisoformat(v) if t is datetime else t(v) for v, t in zip(raw, types)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate_before(query, columns: Sequence, cursor: str, types: Sequence[type]):
+    """
+    Restrict a query ordered by `columns` descending to rows strictly before
+    the cursor. Uses a row-value comparison so it can seek on a composite index.
+    """
+    values = decode_cursor(cursor, types)
+    if len(columns) == 1:
+        return query.where(columns[0] < values[0])
+    return query.where(tuple_(*columns) < tuple_(*values))
+
+
+def set_next_cursor(response: Response, rows: Sequence, limit: int, *key_attrs: str):
+    """Expose the cursor for the next page when this page came back full"""
+    if rows and len(rows) >= limit:
+        last = rows[-1]
+        if isinstance(last, dict):
+            values = (last[a] for a in key_attrs)
+        else:
+            values = (getattr(last, a) for a in key_attrs)
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*values)
@@ -0,0 +1,40 @@
+"""
+Upload storage. `storage` is the backend selected by settings.STORAGE_BACKEND:
+
+- "supabase": Supabase Storage bucket
+- "local": files under LOCAL_STORAGE_DIR, served from LOCAL_STORAGE_URL
+- "memory": in-process dict (tests)
+- "auto" (default): Supabase when it is configured, local disk otherwise
+"""
+from app.core.config import settings
+from app.utils.storage.base import StorageBackend
+from app.utils.storage.local import LocalStorage
+from app.utils.storage.memory import MemoryStorage
+from app.utils.storage.supabase import SupabaseStorage
+
+
+def create_storage(backend: str = None) -> StorageBackend:
+    backend = backend or settings.STORAGE_BACKEND
+    if backend == "supabase":
+        return SupabaseStorage()
+    if backend == "local":
+        return LocalStorage()
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "auto":
+        supabase = SupabaseStorage()
+        return supabase if supabase.is_configured() else LocalStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+# Create a singleton instance
+storage = create_storage()
+
+__all__ = [
+    "StorageBackend",
+    "SupabaseStorage",
+    "LocalStorage",
+    "MemoryStorage",
+    "create_storage",
+    "storage",
+]
@@ -0,0 +1,105 @@
+"""Storage backend interface shared by all drivers"""
+import asyncio
+import logging
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# File content handed to a driver: bytes, or the path of a spooled upload
+# (see utils/uploads.py) that the driver streams from disk
+Content = Union[bytes, Path]
+
+
+class StorageBackend:
+    """
+    Base class for upload storage drivers.
+
+    Drivers implement `_put`, `_delete` and `public_url`; the upload helpers
+    used by the endpoints live here so every driver stores objects under the
+    same layout:
+
+        users/{user_id}/verification/id_card_{uuid}{ext}    verification documents
+        blobs/{sha256[:2]}/{sha256}{ext}                    images, stored as uploaded
+        blobs/{sha256[:2]}/{sha256}_{variant}.webp          processed image variants
+
+    Images are stored once per distinct content (see `blob_stem` and
+    services/blob_service.py). Upload methods take the content as bytes or
+    as a file path and return the public URL, or None if the upload failed.
+    """
+
+    name = "base"
+
+    def is_configured(self) -> bool:
+        return True
+
+    async def upload_verification_document(
+        self,
+        user_id: int,
+        file_path: str,
+        file_content: Content
+    ) -> Optional[str]:
+        """Upload a verification document (ID card) under a unique name"""
+        ext = Path(file_path).suffix.lower()
+        storage_path = f"users/{user_id}/verification/id_card_{uuid.uuid4().hex}{ext}"
+        return await self.save(storage_path, file_content, ext)
+
+    def blob_stem(self, sha256: str) -> str:
+        """Content-addressed storage path (without extension) for a file"""
+        return f"blobs/{sha256[:2]}/{sha256}"
+
+    async def save_image_variants(self, stem: str, variants: Dict[str, bytes]) -> Optional[Dict[str, str]]:
+        """
+        Store rendered WebP variants (name -> bytes) concurrently as
+        {stem}_{name}.webp; returns name -> public URL, or None if any failed
+        """
+        names = list(variants)
+        urls = await asyncio.gather(*(
+            self.save(f"{stem}_{name}.webp", variants[name], ".webp") for name in names
+        ))
+        if any(url is None for url in urls):
+            return None
+        return dict(zip(names, urls))
+
+    async def save(self, storage_path: str, file_content: Content, ext: str = "") -> Optional[str]:
+        """Store `file_content` at `storage_path` (overwriting) and return its public URL"""
+        try:
+            await self._put(storage_path, file_content, self._get_content_type(ext))
+            return self.public_url(storage_path)
+        except Exception:
+            logger.exception("Error uploading %s (%s)", storage_path, self.name)
+            return None
+
+    async def delete_file(self, storage_path: str) -> bool:
+        """Delete a stored object; True if deletion was successful"""
+        try:
+            await self._delete(storage_path)
+            return True
+        except Exception:
+            logger.exception("Error deleting %s (%s)", storage_path, self.name)
+            return False
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+    def public_url(self, storage_path: str) -> str:
+        raise NotImplementedError
+
+    async def _put(self, storage_path: str, file_content: Content, content_type: str):
+        raise NotImplementedError
+
+    async def _delete(self, storage_path: str):
+        raise NotImplementedError
+
+    def _get_content_type(self, extension: str) -> str:
+        """Get MIME type based on file extension"""
+        content_types = {
+            ".jpg": "image/jpeg",
+            ".jpeg": "image/jpeg",
+            ".png": "image/png",
+            ".webp": "image/webp",
+            ".pdf": "application/pdf",
+            ".gif": "image/gif",
+        }
+        return content_types.get(extension.lower(), "application/octet-stream")
@@ -0,0 +1,59 @@
+"""Local filesystem storage driver"""
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from app.core.config import settings
+from app.utils.storage.base import Content, StorageBackend
+from app.utils.threads import WorkerPool
+
+
+class LocalStorage(StorageBackend):
+    """
+    Stores uploads under a directory served by the app's /static mount.
+
+    File I/O runs on a thread pool. Each object is written to a temporary
+    file in the target directory and renamed into place, so readers never
+    see a partially written file and a replaced file is swapped atomically.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str = None, url_prefix: str = None):
+        self.root = Path(root or settings.LOCAL_STORAGE_DIR)
+        self.url_prefix = (url_prefix or settings.LOCAL_STORAGE_URL).rstrip("/")
+        self.pool = WorkerPool(settings.STORAGE_UPLOAD_WORKERS, "storage-local")
+
+    def public_url(self, storage_path: str) -> str:
+        return f"{self.url_prefix}/{storage_path}"
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "root": str(self.root), "pool": self.pool.stats()}
+
+    async def _put(self, storage_path: str, file_content: Content, content_type: str):
+        await self.pool.run(self._write, self._resolve(storage_path), file_content)
+
+    async def _delete(self, storage_path: str):
+        # Idempotent: deleting a missing file is not an error
+        await self.pool.run(self._resolve(storage_path).unlink, True)
+
+    def _resolve(self, storage_path: str) -> Path:
+        path = (self.root / storage_path).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid storage path: {storage_path}")
+        return path
+
+    def _write(self, path: Path, file_content: Content):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            if isinstance(file_content, Path):
+                shutil.copyfile(file_content, tmp_path)
+            else:
+                with tmp_path.open("wb") as buffer:
+                    buffer.write(file_content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
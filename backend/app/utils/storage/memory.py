@@ -0,0 +1,33 @@
+"""In-memory storage driver for tests and local experiments"""
+from pathlib import Path
+from typing import Dict, Tuple
+
+from app.utils.storage.base import Content, StorageBackend
+
+
+class MemoryStorage(StorageBackend):
+    """Keeps uploaded objects in a dict; nothing survives a restart"""
+
+    name = "memory"
+
+    def __init__(self):
+        # storage_path -> (content, content_type)
+        self.objects: Dict[str, Tuple[bytes, str]] = {}
+
+    def public_url(self, storage_path: str) -> str:
+        return f"memory://{storage_path}"
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "objects": len(self.objects),
+            "bytes": sum(len(content) for content, _ in self.objects.values()),
+        }
+
+    async def _put(self, storage_path: str, file_content: Content, content_type: str):
+        if isinstance(file_content, Path):
+            file_content = file_content.read_bytes()
+        self.objects[storage_path] = (file_content, content_type)
+
+    async def _delete(self, storage_path: str):
+        self.objects.pop(storage_path, None)
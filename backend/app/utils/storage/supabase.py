@@ -0,0 +1,62 @@
+"""Supabase storage driver"""
+from typing import Optional, TYPE_CHECKING
+
+from app.core.config import settings
+from app.utils.storage.base import Content, StorageBackend
+from app.utils.threads import WorkerPool
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+try:
+    from supabase import create_client
+except ImportError:
+    create_client = None
+
+
+class SupabaseStorage(StorageBackend):
+    """
+    Wrapper for Supabase storage operations.
+
+    The Supabase client is synchronous, so every request to it runs on a
+    dedicated thread pool: an upload never stalls the event loop, however
+    long the HTTP transfer takes. Objects are written with upsert, so
+    replacing a file is a single request.
+    """
+
+    name = "supabase"
+
+    def __init__(self, url: str = None, key: str = None, bucket_name: str = None):
+        self.url = url or settings.SUPABASE_URL
+        self.key = key or settings.SUPABASE_SERVICE_ROLE_KEY
+        self.bucket_name = bucket_name or settings.SUPABASE_BUCKET
+        self.client: Optional["Client"] = None
+
+        if self.url and self.key and create_client:
+            self.client = create_client(self.url, self.key)
+        self.pool = WorkerPool(settings.STORAGE_UPLOAD_WORKERS, "storage-upload")
+
+    def is_configured(self) -> bool:
+        """Check if Supabase is properly configured"""
+        return self.client is not None
+
+    def public_url(self, storage_path: str) -> str:
+        """Construct public URL for a file"""
+        return f"{self.url}/storage/v1/object/public/{self.bucket_name}/{storage_path}"
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "configured": self.is_configured(), "pool": self.pool.stats()}
+
+    async def _put(self, storage_path: str, file_content: Content, content_type: str):
+        await self.pool.run(self._upload, storage_path, file_content, content_type)
+
+    async def _delete(self, storage_path: str):
+        await self.pool.run(self.client.storage.from_(self.bucket_name).remove, [storage_path])
+
+    def _upload(self, storage_path: str, file_content: Content, content_type: str):
+        """Blocking upload; runs on the storage pool. A path is streamed from disk."""
+        self.client.storage.from_(self.bucket_name).upload(
+            storage_path,
+            file_content,
+            file_options={"content-type": content_type, "upsert": "true"}
+        )
@@ -0,0 +1,53 @@
+"""Dedicated thread pools for blocking work called from async code"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+
+class WorkerPool:
+    """
+    Runs blocking calls on a small dedicated thread pool so they never stall
+    the event loop. The pool size bounds how many calls run in parallel;
+    further calls wait in the pool's queue, and the time spent waiting is
+    recorded for the metrics endpoint.
+    """
+
+    def __init__(self, workers: int, name: str):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self.in_flight = 0
+        self.completed = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    async def run(self, func: Callable, *args):
+        submitted = time.perf_counter()
+        started = None
+
+        def timed():
+            # Runs on a worker thread: only note the start, the counters are
+            # updated on the event loop once the call is done
+            nonlocal started
+            started = time.perf_counter()
+            return func(*args)
+
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, timed)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            if started is not None:
+                waited = started - submitted
+                self.queue_time_total += waited
+                self.queue_time_max = max(self.queue_time_max, waited)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "queue_time_avg_ms": round(self.queue_time_total / self.completed * 1000, 2) if self.completed else None,
+            "queue_time_max_ms": round(self.queue_time_max * 1000, 2),
+        }
@@ -0,0 +1,110 @@
+"""Streaming intake of uploaded files: size limits and hashing without buffering"""
+import hashlib
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Iterable
+
+from fastapi import HTTPException, UploadFile
+
+from app.core.config import settings
+from app.utils.threads import WorkerPool
+
+IMAGE_EXTENSIONS = ("jpg", "jpeg", "png", "webp")
+DOCUMENT_EXTENSIONS = ("jpg", "jpeg", "png", "pdf")
+
+# Copies uploads to their spool file; one job per upload
+spool_pool = WorkerPool(settings.STORAGE_UPLOAD_WORKERS, "upload-spool")
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass
+class ReceivedFile:
+    """An upload spooled to a temporary file, with its size and SHA-256"""
+    path: Path
+    size: int
+    sha256: str
+    ext: str
+
+
+def _spool(source: BinaryIO, max_bytes: int, chunk_size: int) -> tuple:
+    """Copy `source` to a temp file chunk by chunk, hashing as it goes"""
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-", dir=settings.UPLOAD_TMP_DIR)
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            while chunk := source.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge()
+                digest.update(chunk)
+                spool.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return Path(path), size, digest.hexdigest()
+
+
+@asynccontextmanager
+async def receive_upload(
+    file: UploadFile, allowed_extensions: Iterable[str], max_bytes: int
+) -> AsyncIterator[ReceivedFile]:
+    """
+    Validate an UploadFile and stream it to a temporary file in
+    UPLOAD_CHUNK_SIZE chunks, never holding more than one chunk in memory.
+    Rejects bad extensions with 400 and anything over `max_bytes` with 413
+    as soon as the limit is crossed. The temp file is removed on exit.
+    """
+    ext = Path(file.filename or "").suffix.lower()
+    if ext.lstrip(".") not in allowed_extensions:
+        allowed = "/".join(e.upper() for e in allowed_extensions if e != "jpeg")
+        raise HTTPException(status_code=400, detail=f"Invalid file type. Only {allowed} allowed.")
+    too_large = HTTPException(status_code=413, detail=f"File too large (max {max_bytes} bytes)")
+    if file.size is not None and file.size > max_bytes:
+        raise too_large
+
+    try:
+        path, size, sha256 = await spool_pool.run(
+            _spool, file.file, max_bytes, settings.UPLOAD_CHUNK_SIZE
+        )
+    except UploadTooLarge:
+        raise too_large
+    try:
+        yield ReceivedFile(path=path, size=size, sha256=sha256, ext=ext)
+    finally:
+        path.unlink(missing_ok=True)
+
+
+class MaxBodySizeMiddleware:
+    """
+    Rejects requests whose declared Content-Length exceeds `max_bytes` with
+    413 before the body is read, so oversized uploads are not even parsed.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    if value.isdigit() and int(value) > self.max_bytes:
+                        await send({
+                            "type": "http.response.start",
+                            "status": 413,
+                            "headers": [(b"content-type", b"application/json")],
+                        })
+                        await send({
+                            "type": "http.response.body",
+                            "body": b'{"detail":"Request body too large"}',
+                        })
+                        return
+                    break
+        await self.app(scope, receive, send)
@@ -0,0 +1,85 @@
+"""Redis pub/sub backplane that relays websocket messages between worker processes"""
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from app.utils.encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+# Handler signature: (kind, target, data) where data is the encoded text frame
+RelayHandler = Callable[[str, Any, str], Awaitable[None]]
+
+
+class RedisBackplane:
+    """
+    Publishes every outgoing websocket message to a Redis channel and relays
+    messages published by other workers to the local connection manager.
+    """
+
+    def __init__(self, redis, channel: str):
+        self.redis = redis
+        self.channel = channel
+        # Identifies this process so it can skip its own publications
+        self.origin = uuid.uuid4().hex
+        self.published = 0
+        self.relayed = 0
+        self.errors = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    async def publish(self, kind: str, target: Any, data: str):
+        envelope = dumps({"origin": self.origin, "kind": kind, "target": target, "data": data})
+        try:
+            await self.redis.publish(self.channel, envelope)
+            self.published += 1
+        except Exception:
+            self.errors += 1
+            logger.exception("Backplane publish failed")
+
+    async def start(self, handler: RelayHandler):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen(handler))
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> dict:
+        return {
+            "channel": self.channel,
+            "published": self.published,
+            "relayed": self.relayed,
+            "errors": self.errors,
+        }
+
+    async def _listen(self, handler: RelayHandler):
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    envelope = json.loads(message["data"])
+                    if envelope.get("origin") == self.origin:
+                        continue
+                    self.relayed += 1
+                    await handler(envelope["kind"], envelope.get("target"), envelope["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                logger.exception("Backplane listener failed; reconnecting")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
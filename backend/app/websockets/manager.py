@@ -1,49 +1,222 @@
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set, Union
 from fastapi import WebSocket
+import asyncio
 import json
 
+from app.core.config import settings
+from app.utils.encoding import encode_message
+from app.websockets.backplane import RedisBackplane
+
+DEFAULT_CHANNEL = "general"
+
+# Close code sent to clients that cannot keep up with their outbound queue
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+class Connection:
+    """
+    A single websocket plus its bounded outbound queue.
+    Messages are enqueued by broadcasts and drained by a dedicated writer task,
+    so one slow client never delays delivery to the others.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: int, max_queue_size: int, profile: dict = None):
+        self.websocket = websocket
+        self.user_id = user_id
+        # Identity loaded once at connect time (full_name, profile_image_url),
+        # kept current through ConnectionManager.update_user_profile
+        self.profile: dict = profile or {}
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.closed = False
+        self.dropped = 0
+
+    @property
+    def display_name(self) -> str:
+        return self.profile.get("full_name") or f"User {self.user_id}"
+
 class ConnectionManager:
-    def __init__(self):
-        # user_id -> list of active websockets
-        self.active_connections: Dict[int, List[WebSocket]] = {}
-        # channel_name -> set of user ids
-        self.channels: Dict[str, Set[int]] = {}
+    def __init__(self, max_queue_size: int = None, slow_consumer_policy: str = None):
+        self.max_queue_size = max_queue_size or settings.WS_SEND_QUEUE_SIZE
+        # "drop": discard messages for a full queue, "disconnect": close the socket
+        self.slow_consumer_policy = slow_consumer_policy or settings.WS_SLOW_CONSUMER_POLICY
+        # user_id -> list of active connections
+        self.active_connections: Dict[int, List[Connection]] = {}
+        # channel_name -> set of connections subscribed to it
+        self.channels: Dict[str, Set[Connection]] = {}
+        # connection -> channel names it is subscribed to (for cleanup on disconnect)
+        self.subscriptions: Dict[Connection, Set[str]] = {}
+        # Delivery counters exposed through stats()
+        self.sent_messages = 0
+        self.dropped_messages = 0
+        self.slow_consumer_disconnects = 0
+        # Pending closes of slow consumers; the loop only keeps weak references to tasks
+        self._close_tasks: Set[asyncio.Task] = set()
+        # Set by start() when messages must also reach sockets held by other workers
+        self.backplane: Optional[RedisBackplane] = None
 
-    async def connect(self, websocket: WebSocket, user_id: int):
+    async def start(self):
+        if settings.WS_BACKPLANE == "redis" and self.backplane is None:
+            from app.utils.redis import redis_client
+            self.backplane = RedisBackplane(redis_client, settings.WS_BACKPLANE_CHANNEL)
+            await self.backplane.start(self._relay)
+
+    async def stop(self):
+        if self.backplane is not None:
+            await self.backplane.stop()
+            self.backplane = None
+
+    async def connect(self, websocket: WebSocket, user_id: int, profile: dict = None) -> Connection:
         await websocket.accept()
+        connection = Connection(websocket, user_id, self.max_queue_size, profile)
+        connection.writer = asyncio.create_task(self._write_loop(connection))
         if user_id not in self.active_connections:
             self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+        self.active_connections[user_id].append(connection)
+        # Every socket listens on the campus-wide channel (broadcast notifications)
+        self.join(connection, DEFAULT_CHANNEL)
+        return connection
 
-    def disconnect(self, websocket: WebSocket, user_id: int):
+    def disconnect(self, connection: Connection):
+        if connection.closed:
+            return
+        connection.closed = True
+        if connection.writer and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+        for channel in list(self.subscriptions.get(connection, ())):
+            self.leave(connection, channel)
+        self.subscriptions.pop(connection, None)
+        user_id = connection.user_id
         if user_id in self.active_connections:
-            if websocket in self.active_connections[user_id]:
-                self.active_connections[user_id].remove(websocket)
+            if connection in self.active_connections[user_id]:
+                self.active_connections[user_id].remove(connection)
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
 
-    async def send_personal_message(self, message: dict, user_id: int):
-        if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                await connection.send_json(message)
-
-    async def broadcast_to_channel(self, message: dict, channel: str):
-        # In a real-world app, we'd only send to users joined to this channel
-        # For simplicity in this campus app, we can broadcast to all or filter
-        # but let's implement a simple broadcast for now.
-        for connections in self.active_connections.values():
-            for connection in connections:
-                try:
-                    await connection.send_json(message)
-                except:
-                    pass
-
-    async def broadcast(self, message: dict):
-        for connections in self.active_connections.values():
-            for connection in connections:
-                try:
-                    await connection.send_json(message)
-                except:
-                    pass
+    def join(self, connection: Connection, channel: str):
+        if connection.closed:
+            return
+        self.channels.setdefault(channel, set()).add(connection)
+        self.subscriptions.setdefault(connection, set()).add(channel)
+
+    def leave(self, connection: Connection, channel: str):
+        members = self.channels.get(channel)
+        if members is not None:
+            members.discard(connection)
+            if not members:
+                del self.channels[channel]
+        if connection in self.subscriptions:
+            self.subscriptions[connection].discard(channel)
+
+    # Messages are serialized once per call and the same text frame is queued
+    # for every recipient. Callers may also pass an already encoded string.
+    # With a backplane, local sockets are served directly and the frame is
+    # published once for the other workers to relay to theirs.
+
+    async def send_personal_message(self, message: Union[dict, str], user_id: int):
+        data = encode_message(message)
+        self._deliver_to_user(data, user_id)
+        if self.backplane is not None:
+            await self.backplane.publish("user", user_id, data)
+
+    async def broadcast_to_channel(self, message: Union[dict, str], channel: str):
+        data = encode_message(message)
+        self._deliver_to_channel(data, channel)
+        if self.backplane is not None:
+            await self.backplane.publish("channel", channel, data)
+
+    async def broadcast(self, message: Union[dict, str]):
+        data = encode_message(message)
+        self._deliver_to_all(data)
+        if self.backplane is not None:
+            await self.backplane.publish("broadcast", None, data)
+
+    async def update_user_profile(self, user_id: int, profile: dict):
+        """Refresh the cached identity on every connection the user has open"""
+        self._apply_profile(user_id, profile)
+        if self.backplane is not None:
+            await self.backplane.publish("profile", user_id, encode_message(profile))
+
+    def stats(self) -> dict:
+        depths = [
+            connection.queue.qsize()
+            for connections in self.active_connections.values()
+            for connection in connections
+        ]
+        return {
+            "connections": len(depths),
+            "users": len(self.active_connections),
+            "channels": len(self.channels),
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "queue_capacity": self.max_queue_size,
+            "sent_messages": self.sent_messages,
+            "dropped_messages": self.dropped_messages,
+            "slow_consumer_disconnects": self.slow_consumer_disconnects,
+            "backplane": self.backplane.stats() if self.backplane else None,
+        }
+
+    def _deliver_to_user(self, data: str, user_id: int):
+        for connection in list(self.active_connections.get(user_id, ())):
+            self._enqueue(connection, data)
+
+    def _deliver_to_channel(self, data: str, channel: str):
+        # Only sockets subscribed to the channel receive the message, so the
+        # cost of a send scales with channel membership, not total connections.
+        # Copy the set: a slow consumer may be disconnected mid-loop.
+        for connection in list(self.channels.get(channel, ())):
+            self._enqueue(connection, data)
+
+    def _deliver_to_all(self, data: str):
+        for connections in list(self.active_connections.values()):
+            for connection in list(connections):
+                self._enqueue(connection, data)
+
+    def _apply_profile(self, user_id: int, profile: dict):
+        for connection in self.active_connections.get(user_id, ()):
+            connection.profile.update(profile)
+
+    async def _relay(self, kind: str, target, data: str):
+        """Deliver a message published by another worker to local sockets"""
+        if kind == "profile":
+            self._apply_profile(int(target), json.loads(data))
+        elif kind == "user":
+            self._deliver_to_user(data, int(target))
+        elif kind == "channel":
+            self._deliver_to_channel(data, target)
+        elif kind == "broadcast":
+            self._deliver_to_all(data)
+
+    def _enqueue(self, connection: Connection, data: str):
+        if connection.closed:
+            return
+        try:
+            connection.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            connection.dropped += 1
+            self.dropped_messages += 1
+            if self.slow_consumer_policy == "disconnect":
+                self.slow_consumer_disconnects += 1
+                self.disconnect(connection)
+                task = asyncio.create_task(self._close(connection))
+                self._close_tasks.add(task)
+                task.add_done_callback(self._close_tasks.discard)
+
+    async def _write_loop(self, connection: Connection):
+        try:
+            while True:
+                data = await connection.queue.get()
+                await connection.websocket.send_text(data)
+                self.sent_messages += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The socket is gone; the receive loop will notice as well
+            self.disconnect(connection)
+
+    async def _close(self, connection: Connection):
+        try:
+            await connection.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
 
 manager = ConnectionManager()
@@ -0,0 +1,54 @@
+"""limit_event_buddies_to_small_events
+
+Revision ID: 0d7e4f9a2b68
+Revises: f1b6c8d4a953
+Create Date: 2026-10-18 22:37:51.240196
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0d7e4f9a2b68'
+down_revision: Union[str, Sequence[str], None] = 'f1b6c8d4a953'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match the limit add_co_attendance applies at runtime
+MAX_EVENT_SIZE = settings.BUDDY_GRAPH_MAX_EVENT_SIZE
+
+
+def _rebuild(max_event_size=None) -> None:
+    size_filter = "" if max_event_size is None else f"WHERE e.registered_count <= {int(max_event_size)}"
+    op.execute("DELETE FROM event_buddies")
+    op.execute(f"""
+        INSERT INTO event_buddies (user_id, buddy_id, shared_events)
+        SELECT mine.user_id, theirs.user_id, count(*)
+        FROM participations mine
+        JOIN participations theirs
+            ON theirs.event_id = mine.event_id AND theirs.user_id != mine.user_id
+        JOIN events e ON e.id = mine.event_id
+        {size_filter}
+        GROUP BY mine.user_id, theirs.user_id
+    """)
+    op.execute("""
+        UPDATE users SET buddies_count = (
+            SELECT count(*) FROM event_buddies b WHERE b.user_id = users.id
+        )
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Large events no longer count towards the co-attendance graph
+    _rebuild(MAX_EVENT_SIZE)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rebuild()
@@ -0,0 +1,34 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: 3f9c2a7d4e15
+Revises: 6e7851e41d90
+Create Date: 2026-10-18 10:12:41.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2a7d4e15'
+down_revision: Union[str, Sequence[str], None] = '6e7851e41d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_messages_channel_timestamp_id', 'messages', ['channel', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_notifications_user_id_created_at', 'notifications', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_events_college_id_created_at_id', 'events', ['college_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_marketplace_items_created_at_id', 'marketplace_items', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_marketplace_items_created_at_id', table_name='marketplace_items')
+    op.drop_index('ix_events_college_id_created_at_id', table_name='events')
+    op.drop_index('ix_notifications_user_id_created_at', table_name='notifications')
+    op.drop_index('ix_messages_channel_timestamp_id', table_name='messages')
@@ -0,0 +1,32 @@
+"""add_image_variants
+
+Revision ID: 7a3c9e5b1f24
+Revises: 0d7e4f9a2b68
+Create Date: 2026-10-18 23:41:06.518302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3c9e5b1f24'
+down_revision: Union[str, Sequence[str], None] = '0d7e4f9a2b68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('profile_image_variants', sa.JSON(), nullable=True))
+    op.add_column('events', sa.Column('image_variants', sa.JSON(), nullable=True))
+    op.add_column('marketplace_items', sa.Column('image_variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('marketplace_items', 'image_variants')
+    op.drop_column('events', 'image_variants')
+    op.drop_column('users', 'profile_image_variants')
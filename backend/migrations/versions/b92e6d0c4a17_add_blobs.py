@@ -0,0 +1,48 @@
+"""add_blobs
+
+Revision ID: b92e6d0c4a17
+Revises: 7a3c9e5b1f24
+Create Date: 2026-10-19 00:52:17.903518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b92e6d0c4a17'
+down_revision: Union[str, Sequence[str], None] = '7a3c9e5b1f24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('image_url', sa.String(), nullable=True),
+    sa.Column('image_variants', sa.JSON(), nullable=True),
+    sa.Column('storage_paths', sa.JSON(), nullable=True),
+    sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('released_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('sha256'),
+    sa.UniqueConstraint('image_url')
+    )
+    op.create_index('ix_blobs_ref_count_released_at', 'blobs', ['ref_count', 'released_at'], unique=False)
+    # Reference recount of blobs (services/blob_service.py)
+    op.create_index(op.f('ix_users_profile_image_url'), 'users', ['profile_image_url'], unique=False)
+    op.create_index(op.f('ix_events_image_url'), 'events', ['image_url'], unique=False)
+    op.create_index(op.f('ix_marketplace_items_image_url'), 'marketplace_items', ['image_url'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_marketplace_items_image_url'), table_name='marketplace_items')
+    op.drop_index(op.f('ix_events_image_url'), table_name='events')
+    op.drop_index(op.f('ix_users_profile_image_url'), table_name='users')
+    op.drop_index('ix_blobs_ref_count_released_at', table_name='blobs')
+    op.drop_table('blobs')
@@ -0,0 +1,43 @@
+"""add_participation_indexes_backfill_counters
+
+Revision ID: c4d8e2a61b37
+Revises: 8b1e4d6f2c90
+Create Date: 2026-10-18 19:02:33.108425
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8e2a61b37'
+down_revision: Union[str, Sequence[str], None] = '8b1e4d6f2c90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_participations_user_id', 'participations', ['user_id'], unique=False)
+    op.create_index('ix_participations_event_id_user_id', 'participations', ['event_id', 'user_id'], unique=False)
+    # Counters were previously written by GET /users/me; fill them for everyone
+    op.execute("""
+        UPDATE users SET
+            events_count = (
+                SELECT count(*) FROM participations p WHERE p.user_id = users.id
+            ),
+            buddies_count = (
+                SELECT count(DISTINCT theirs.user_id)
+                FROM participations mine
+                JOIN participations theirs ON theirs.event_id = mine.event_id
+                WHERE mine.user_id = users.id AND theirs.user_id != users.id
+            )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_participations_event_id_user_id', table_name='participations')
+    op.drop_index('ix_participations_user_id', table_name='participations')
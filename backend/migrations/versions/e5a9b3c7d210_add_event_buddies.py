@@ -0,0 +1,53 @@
+"""add_event_buddies
+
+Revision ID: e5a9b3c7d210
+Revises: c4d8e2a61b37
+Create Date: 2026-10-18 20:11:48.527301
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a9b3c7d210'
+down_revision: Union[str, Sequence[str], None] = 'c4d8e2a61b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('event_buddies',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('buddy_id', sa.Integer(), nullable=False),
+    sa.Column('shared_events', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['buddy_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'buddy_id')
+    )
+    op.create_index('ix_event_buddies_buddy_id', 'event_buddies', ['buddy_id'], unique=False)
+    op.create_index('ix_event_buddies_user_id_shared_events', 'event_buddies', ['user_id', 'shared_events'], unique=False)
+    # Build the graph from existing participations, then align buddies_count
+    op.execute("""
+        INSERT INTO event_buddies (user_id, buddy_id, shared_events)
+        SELECT mine.user_id, theirs.user_id, count(DISTINCT mine.event_id)
+        FROM participations mine
+        JOIN participations theirs
+            ON theirs.event_id = mine.event_id AND theirs.user_id != mine.user_id
+        GROUP BY mine.user_id, theirs.user_id
+    """)
+    op.execute("""
+        UPDATE users SET buddies_count = (
+            SELECT count(*) FROM event_buddies b WHERE b.user_id = users.id
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_event_buddies_user_id_shared_events', table_name='event_buddies')
+    op.drop_index('ix_event_buddies_buddy_id', table_name='event_buddies')
+    op.drop_table('event_buddies')
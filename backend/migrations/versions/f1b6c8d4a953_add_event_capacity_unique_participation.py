@@ -0,0 +1,53 @@
+"""add_event_capacity_unique_participation
+
+Revision ID: f1b6c8d4a953
+Revises: e5a9b3c7d210
+Create Date: 2026-10-18 21:24:09.884612
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b6c8d4a953'
+down_revision: Union[str, Sequence[str], None] = 'e5a9b3c7d210'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Remove double registrations left by the old SELECT-then-INSERT path,
+    # keeping the earliest one
+    op.execute("""
+        DELETE FROM participations
+        WHERE id NOT IN (
+            SELECT min(id) FROM participations GROUP BY user_id, event_id
+        )
+    """)
+    op.execute("""
+        UPDATE users SET events_count = (
+            SELECT count(*) FROM participations p WHERE p.user_id = users.id
+        )
+    """)
+    op.drop_index('ix_participations_user_id', table_name='participations')
+    op.create_index('ix_participations_user_id_event_id', 'participations', ['user_id', 'event_id'], unique=True)
+
+    op.add_column('events', sa.Column('capacity', sa.Integer(), nullable=True))
+    op.add_column('events', sa.Column('registered_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE events SET registered_count = (
+            SELECT count(*) FROM participations p WHERE p.event_id = events.id
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('events', 'registered_count')
+    op.drop_column('events', 'capacity')
+    op.drop_index('ix_participations_user_id_event_id', table_name='participations')
+    op.create_index('ix_participations_user_id', 'participations', ['user_id'], unique=False)
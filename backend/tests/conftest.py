@@ -0,0 +1,128 @@
+"""
+Test setup: the app runs against a throwaway SQLite database and in-memory
+storage, with background jobs disabled. The environment must be set before
+anything from `app` is imported, since settings and the engine are created
+at import time.
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="campuslink-tests-")
+os.environ.update({
+    # SQLite serializes writers; let them queue through the concurrency tests
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_tmp}/test.db?timeout=60",
+    "DATABASE_REPLICA_URL": "",
+    "SUPABASE_URL": "",
+    "SUPABASE_SERVICE_ROLE_KEY": "",
+    "STORAGE_BACKEND": "memory",
+    "LOCAL_STORAGE_DIR": os.path.join(_tmp, "static"),
+    "IMAGE_PROCESS_WORKERS": "0",
+    "USER_STATS_REFRESH_SECONDS": "0",
+    "BLOB_GC_INTERVAL_SECONDS": "0",
+    "WS_BACKPLANE": "local",
+    "CHAT_CACHE_BACKEND": "local",
+    "PRINCIPAL_CACHE_BACKEND": "local",
+})
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, insert, select
+
+from app.core import security
+from app.db.session import AsyncSessionLocal, Base, engine
+from app.models.models import EventBuddy, User
+from app.services import event_service
+from app.services.principal_cache import principal_cache
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+async def reset_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    # Ids are handed out again; forget principals of the previous schema
+    await principal_cache.clear()
+
+
+@pytest.fixture
+async def db(anyio_backend):
+    """Fresh schema for an async test; yields a session"""
+    await reset_db()
+    async with AsyncSessionLocal() as session:
+        yield session
+    # Pooled connections belong to this test's event loop
+    await engine.dispose()
+
+
+@pytest.fixture
+def client():
+    """TestClient on a fresh schema, with the app's lifespan running"""
+    from app.main import app
+    with TestClient(app) as test_client:
+        test_client.portal.call(reset_db)
+        yield test_client
+        test_client.portal.call(engine.dispose)
+
+
+@pytest.fixture
+async def api(db):
+    """
+    Async HTTP client on the app, in the test's event loop, for requests
+    that must run concurrently. The app's lifespan is not started.
+    """
+    from app.main import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def statements():
+    """SQL statements sent to the database while the test runs"""
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield captured
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+def create_user(client: TestClient, email: str, **fields) -> tuple:
+    """Insert a user directly; returns its id and Authorization headers"""
+    async def insert_user():
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                insert(User).values(email=email, hashed_password="x", **fields).returning(User.id)
+            )
+            user_id = result.scalar_one()
+            await session.commit()
+            return user_id
+
+    user_id = client.portal.call(insert_user)
+    return user_id, {"Authorization": f"Bearer {security.create_access_token(user_id)}"}
+
+
+async def _buddy_graph(session) -> tuple:
+    pairs = await session.execute(select(EventBuddy.user_id, EventBuddy.buddy_id, EventBuddy.shared_events))
+    counts = await session.execute(select(User.id, func.coalesce(User.buddies_count, 0)))
+    return set(pairs.all()), dict(counts.all())
+
+
+async def buddy_graph_and_rebuild() -> tuple:
+    """
+    The event_buddies rows and buddies_count of every user as maintained,
+    and as event_service.rebuild_buddy_graph computes them from scratch
+    """
+    async with AsyncSessionLocal() as session:
+        maintained = await _buddy_graph(session)
+        await event_service.rebuild_buddy_graph(session)
+        rebuilt = await _buddy_graph(session)
+        await session.rollback()
+    return maintained, rebuilt
@@ -0,0 +1,68 @@
+import time
+from datetime import timedelta
+
+import pytest
+from jose import jwt
+
+from app.core import security
+from tests.conftest import create_user
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Tokens verified by python-jose, starting from an empty token cache"""
+    verified = []
+
+    def decode(token, *args, **kwargs):
+        verified.append(token)
+        return original(token, *args, **kwargs)
+
+    original = jwt.decode
+    monkeypatch.setattr(jwt, "decode", decode)
+    security.token_cache.clear()
+    return verified
+
+
+def test_verified_claims_are_cached(decodes):
+    token = security.create_access_token(42)
+
+    assert security.decode_access_token(token)["sub"] == "42"
+    assert security.decode_access_token(token)["sub"] == "42"
+    assert decodes == [token]
+
+
+def test_http_and_websocket_auth_share_the_cache(client, decodes):
+    _, headers = create_user(client, "ada@example.com")
+    token = headers["Authorization"].split()[1]
+
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+    with client.websocket_connect(f"/api/v1/ws/{token}") as websocket:
+        websocket.send_json({"content": "hi", "channel": "general"})
+        assert websocket.receive_json()["content"] == "hi"
+    assert decodes == [token]
+
+
+def test_cached_claims_expire_with_the_token(decodes):
+    token = security.create_access_token(42, expires_delta=timedelta(seconds=2))
+    security.decode_access_token(token)
+
+    time.sleep(2.1)
+    # Past exp the token is verified again rather than served from the
+    # cache (python-jose compares whole seconds, so it may still pass)
+    try:
+        security.decode_access_token(token)
+    except jwt.ExpiredSignatureError:
+        pass
+    assert decodes == [token, token]
+
+
+def test_invalid_tokens_are_not_cached(decodes):
+    token = security.create_access_token(42)
+    tampered = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+
+    for _ in range(2):
+        with pytest.raises(jwt.JWTError):
+            security.decode_access_token(tampered)
+    assert decodes == [tampered, tampered]
+    assert len(security.token_cache) == 0
@@ -0,0 +1,126 @@
+import random
+import time
+
+from sqlalchemy import and_, func, insert, select
+from sqlalchemy.orm import aliased
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.models import Event, Participation, User
+from app.services import event_service
+from tests.conftest import buddy_graph_and_rebuild, create_user
+
+# Benchmark campus: 8000 students, 2000 events of 25 attendees
+STUDENTS = 8000
+EVENTS = 2000
+EVENT_SIZE = 25
+
+
+def _assert_graph_matches_rebuild(client):
+    maintained, rebuilt = client.portal.call(buddy_graph_and_rebuild)
+    assert maintained == rebuilt
+
+
+def _create_event(client, headers) -> int:
+    response = client.post("/api/v1/events/", headers=headers, json={"title": "Meetup"})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def _bulk_register(client, headers, event_id, user_ids):
+    response = client.post(
+        f"/api/v1/events/{event_id}/register/bulk", headers=headers, json={"user_ids": user_ids}
+    )
+    assert response.status_code == 200
+
+
+def test_graph_is_maintained_like_a_rebuild(client, monkeypatch):
+    monkeypatch.setattr(settings, "BUDDY_GRAPH_MAX_EVENT_SIZE", 4)
+    _, admin = create_user(client, "admin@example.com", role="college_admin")
+    users = [create_user(client, f"user{i}@example.com") for i in range(6)]
+    ids = [user_id for user_id, _ in users]
+    small, medium, large = (_create_event(client, admin) for _ in range(3))
+
+    for _, headers in users[:2]:
+        assert client.post(f"/api/v1/events/{small}/register", headers=headers).status_code == 200
+    _assert_graph_matches_rebuild(client)
+
+    _bulk_register(client, admin, medium, ids[:3])
+    _assert_graph_matches_rebuild(client)
+
+    # Registered one by one, the fifth attendee takes the event out of the graph
+    for _, headers in users[1:]:
+        assert client.post(f"/api/v1/events/{large}/register", headers=headers).status_code == 200
+        _assert_graph_matches_rebuild(client)
+
+    # A bulk registration takes "small" from 2 attendees straight past the limit
+    _bulk_register(client, admin, small, ids[2:5])
+    _assert_graph_matches_rebuild(client)
+
+    buddies = client.get("/api/v1/users/me/buddies", headers=users[0][1]).json()
+    assert [(b["id"], b["shared_events"]) for b in buddies] == [(ids[1], 1), (ids[2], 1)]
+
+    for event_id in (medium, large, small):
+        assert client.delete(f"/api/v1/events/{event_id}", headers=admin).status_code == 200
+        _assert_graph_matches_rebuild(client)
+    (pairs, buddies_counts), _ = client.portal.call(buddy_graph_and_rebuild)
+    assert pairs == set() and set(buddies_counts.values()) == {0}
+
+
+def test_top_buddies_benchmark(client):
+    """Top-20 buddies from event_buddies against the self-join it replaced"""
+    async def seed():
+        rng = random.Random(18)
+        async with AsyncSessionLocal() as session:
+            await session.execute(insert(User), [
+                {"email": f"student{i}@example.com", "hashed_password": "x"} for i in range(STUDENTS)
+            ])
+            user_ids = list((await session.execute(select(User.id))).scalars())
+            await session.execute(insert(Event), [
+                {"title": f"Event {i}", "registered_count": EVENT_SIZE} for i in range(EVENTS)
+            ])
+            event_ids = list((await session.execute(select(Event.id))).scalars())
+            await session.execute(insert(Participation), [
+                {"user_id": user_id, "event_id": event_id, "status": "registered"}
+                for event_id in event_ids for user_id in rng.sample(user_ids, EVENT_SIZE)
+            ])
+            await event_service.rebuild_buddy_graph(session)
+            await session.commit()
+            return rng.sample(user_ids, 50)
+
+    sample = client.portal.call(seed)
+
+    async def self_join(session, user_id):
+        mine = aliased(Participation)
+        theirs = aliased(Participation)
+        shared = func.count().label("shared_events")
+        result = await session.execute(
+            select(theirs.user_id, shared)
+            .select_from(mine)
+            .join(theirs, and_(theirs.event_id == mine.event_id, theirs.user_id != mine.user_id))
+            .where(mine.user_id == user_id)
+            .group_by(theirs.user_id)
+            .order_by(shared.desc(), theirs.user_id)
+            .limit(20)
+        )
+        return result.all()
+
+    async def graph(session, user_id):
+        rows = await event_service.get_top_buddies(session, user_id, 20)
+        return [(row["id"], row["shared_events"]) for row in rows]
+
+    async def timed(read):
+        async with AsyncSessionLocal() as session:
+            started = time.perf_counter()
+            results = [await read(session, user_id) for user_id in sample]
+            return results, time.perf_counter() - started
+
+    expected, join_seconds = client.portal.call(timed, self_join)
+    actual, graph_seconds = client.portal.call(timed, graph)
+
+    assert actual == [[tuple(row) for row in rows] for rows in expected]
+    print(
+        f"\ntop-20 buddies, {EVENTS * EVENT_SIZE} participations, {len(sample)} users: "
+        f"self-join {join_seconds * 1000:.0f} ms, event_buddies {graph_seconds * 1000:.0f} ms"
+    )
+    assert graph_seconds < join_seconds
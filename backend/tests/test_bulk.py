@@ -0,0 +1,133 @@
+import time
+
+from sqlalchemy import insert, select, update
+
+from app.db.session import AsyncSessionLocal
+from app.models.models import Event, Participation, User
+from tests.conftest import create_user
+
+CHECK_INS = 5000
+
+
+def _create_event(client, headers, **fields) -> int:
+    response = client.post("/api/v1/events/", headers=headers, json={"title": "Orientation", **fields})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def _bulk(client, headers, event_id, action, user_ids):
+    response = client.post(f"/api/v1/events/{event_id}/{action}", headers=headers, json={"user_ids": user_ids})
+    assert response.status_code == 200
+    body = response.json()
+    return [(r["user_id"], r["status"]) for r in body["results"]], body["summary"]
+
+
+def _run(client, statement):
+    async def execute():
+        async with AsyncSessionLocal() as session:
+            await session.execute(statement)
+            await session.commit()
+    client.portal.call(execute)
+
+
+def test_bulk_register_outcomes(client):
+    _, admin = create_user(client, "admin@example.com", role="college_admin")
+    u1, u2, u3, u4 = (create_user(client, f"user{i}@example.com")[0] for i in range(4))
+    event_id = _create_event(client, admin, capacity=3)
+    _bulk(client, admin, event_id, "register/bulk", [u4])
+
+    results, summary = _bulk(client, admin, event_id, "register/bulk", [u1, u4, 9999, u2, u3, u1])
+
+    # Duplicates are reported once; the last free seat goes to u2, who came first
+    assert results == [
+        (u1, "registered"),
+        (u4, "already_registered"),
+        (9999, "user_not_found"),
+        (u2, "registered"),
+        (u3, "event_full"),
+    ]
+    assert summary == {"registered": 2, "already_registered": 1, "user_not_found": 1, "event_full": 1}
+    assert client.get(f"/api/v1/events/{event_id}").json()["registered_count"] == 3
+
+
+def test_bulk_register_needs_the_organizer(client):
+    _, admin = create_user(client, "admin@example.com", role="college_admin")
+    user_id, headers = create_user(client, "user@example.com")
+    event_id = _create_event(client, admin)
+
+    response = client.post(
+        f"/api/v1/events/{event_id}/register/bulk", headers=headers, json={"user_ids": [user_id]}
+    )
+    assert response.status_code == 403
+
+
+def test_bulk_check_in_outcomes(client):
+    _, admin = create_user(client, "admin@example.com", role="college_admin")
+    u1, u2, u3, u4 = (create_user(client, f"user{i}@example.com")[0] for i in range(4))
+    event_id = _create_event(client, admin)
+    _bulk(client, admin, event_id, "register/bulk", [u1, u2, u3])
+    _run(client, update(Participation).where(Participation.user_id == u3).values(status="cancelled"))
+
+    results, summary = _bulk(client, admin, event_id, "check-in", [u1, u1, u3, u4, 9999])
+    assert results == [
+        (u1, "checked_in"),
+        (u3, "not_registered"),
+        (u4, "not_registered"),
+        (9999, "not_registered"),
+    ]
+    assert summary == {"checked_in": 1, "not_registered": 3}
+
+    results, _ = _bulk(client, admin, event_id, "check-in", [u1, u2])
+    assert results == [(u1, "already_checked_in"), (u2, "checked_in")]
+
+
+def test_check_in_benchmark(client, statements):
+    """5000 scanned QR codes in one request against one UPDATE per participant"""
+    _, admin = create_user(client, "admin@example.com", role="college_admin")
+    bulk_event, single_event = _create_event(client, admin), _create_event(client, admin)
+
+    async def seed():
+        async with AsyncSessionLocal() as session:
+            await session.execute(insert(User), [
+                {"email": f"student{i}@example.com", "hashed_password": "x"} for i in range(CHECK_INS)
+            ])
+            user_ids = list((await session.execute(
+                select(User.id).where(User.email.like("student%"))
+            )).scalars())
+            await session.execute(insert(Participation), [
+                {"user_id": user_id, "event_id": event_id, "status": "registered"}
+                for event_id in (bulk_event, single_event) for user_id in user_ids
+            ])
+            await session.commit()
+            return user_ids
+
+    user_ids = client.portal.call(seed)
+
+    statements.clear()
+    started = time.perf_counter()
+    results, summary = _bulk(client, admin, bulk_event, "check-in", user_ids)
+    bulk_seconds = time.perf_counter() - started
+    assert summary == {"checked_in": CHECK_INS}
+    bulk_statements = len(statements)
+
+    async def check_in_one_by_one():
+        async with AsyncSessionLocal() as session:
+            for user_id in user_ids:
+                await session.execute(
+                    update(Participation)
+                    .where(Participation.event_id == single_event, Participation.user_id == user_id)
+                    .values(status="attended")
+                )
+            await session.commit()
+
+    started = time.perf_counter()
+    client.portal.call(check_in_one_by_one)
+    single_seconds = time.perf_counter() - started
+
+    print(
+        f"\n{CHECK_INS} check-ins: bulk {bulk_seconds * 1000:.0f} ms in {bulk_statements} statements, "
+        f"one by one {single_seconds * 1000:.0f} ms"
+    )
+    # Organizer lookup and the UPDATE ... RETURNING, whatever the batch size
+    assert bulk_statements <= 3
+    assert bulk_seconds < single_seconds
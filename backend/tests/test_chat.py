@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import Response
+from sqlalchemy import insert
+
+from app.api.v1.endpoints import chat
+from app.models.models import Message, User
+from app.services.message_cache import RecentMessageCache
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+
+@pytest.fixture
+async def history(db, monkeypatch):
+    """120 messages in #general; every third one from a sender that no longer exists"""
+    monkeypatch.setattr(chat, "message_cache", RecentMessageCache(backend="local"))
+    user_id = (await db.execute(
+        insert(User).values(email="a@example.com", hashed_password="x", full_name="Ada").returning(User.id)
+    )).scalar_one()
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    await db.execute(insert(Message), [
+        {
+            "sender_id": 9999 if i % 3 == 0 else user_id,
+            "content": f"message {i}",
+            "channel": "general",
+            "timestamp": start + timedelta(seconds=i),
+        }
+        for i in range(120)
+    ])
+    await db.commit()
+    return db
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("limit", [5, 50])
+async def test_first_page_is_one_statement(history, statements, limit):
+    messages = await chat.read_messages("general", Response(), history, 0, limit, None)
+    assert len(messages) == limit
+    assert len(statements) == 1
+    assert messages[0].content == "message 119"
+    assert {m.sender_name for m in messages} == {"Ada", "User 9999"}
+
+    # The cache was primed by the miss; the next first page needs no query
+    statements.clear()
+    assert len(await chat.read_messages("general", Response(), history, 0, limit, None)) == limit
+    assert statements == []
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("limit", [5, 50])
+async def test_older_pages_are_one_statement_each(history, statements, limit):
+    response = Response()
+    await chat.read_messages("general", response, history, 0, limit, None)
+    statements.clear()
+
+    older = await chat.read_messages(
+        "general", Response(), history, 0, limit, response.headers[NEXT_CURSOR_HEADER]
+    )
+    assert [m.content for m in older] == [f"message {i}" for i in range(119 - limit, 119 - 2 * limit, -1)]
+    assert len(statements) == 1
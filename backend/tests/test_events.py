@@ -0,0 +1,37 @@
+from sqlalchemy import event
+
+from app.db.session import engine
+from tests.conftest import create_user
+
+EVENT = {
+    "title": "Hackathon",
+    "location": "Main hall",
+    "start_time": "2030-01-01T10:00:00",
+    "end_time": "2030-01-01T18:00:00",
+}
+
+
+def test_create_event_is_one_flush_and_one_commit(client, statements):
+    _, headers = create_user(client, "admin@example.com", role="college_admin", full_name="Admin")
+    statements.clear()
+    commits = []
+
+    def record_commit(conn):
+        commits.append(conn)
+
+    event.listen(engine.sync_engine, "commit", record_commit)
+    try:
+        response = client.post("/api/v1/events/", headers=headers, json=EVENT)
+    finally:
+        event.remove(engine.sync_engine, "commit", record_commit)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["id"] and body["created_at"]
+    # Previously two commits, each followed by a SELECT to refresh the row.
+    # Now both rows go out in one flush, with generated columns returned by
+    # the INSERTs, and the request's unit of work commits once.
+    writes = [s.split()[:3] for s in statements if not s.lstrip().upper().startswith("SELECT")]
+    assert writes == [["INSERT", "INTO", "events"], ["INSERT", "INTO", "notifications"]]
+    assert not [s for s in statements if "FROM events" in s or "FROM notifications" in s]
+    assert len(commits) == 1
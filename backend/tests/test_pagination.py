@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert
+
+from app.db.session import AsyncSessionLocal
+from app.models.models import Event, Notification
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from tests.conftest import create_user
+
+NOON = datetime(2024, 9, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _insert(client, model, rows):
+    async def execute():
+        async with AsyncSessionLocal() as session:
+            await session.execute(insert(model), rows)
+            await session.commit()
+    client.portal.call(execute)
+
+
+def _walk(client, url, headers, limit):
+    """Follow X-Next-Cursor from the first page to the last; returns the pages' ids"""
+    pages = []
+    params = {"limit": limit}
+    while True:
+        response = client.get(url, headers=headers, params=params)
+        assert response.status_code == 200
+        pages.append([row["id"] for row in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+        params = {"limit": limit, "before": cursor}
+
+
+@pytest.mark.parametrize("model, url", [
+    (Event, "/api/v1/events/"),
+    (Notification, "/api/v1/notifications/"),
+])
+def test_cursor_walk_with_tied_timestamps(client, model, url):
+    user_id, headers = create_user(client, "admin@example.com", is_superuser=True)
+    required = {"organizer_id": user_id} if model is Event else {"message": "Hello"}
+    # Eight rows share a timestamp; the id breaks the tie
+    created = [NOON] * 8 + [NOON - timedelta(minutes=1), NOON + timedelta(minutes=1)]
+    _insert(client, model, [
+        {"title": f"Row {i}", "created_at": at, **required} for i, at in enumerate(created)
+    ])
+
+    pages = _walk(client, url, headers, limit=3)
+
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    ids = [row_id for page in pages for row_id in page]
+    # Newest first: the later row, the ties by descending id, then the earlier row
+    assert ids == [10] + list(range(8, 0, -1)) + [9]
+
+
+@pytest.mark.parametrize("url", [
+    "/api/v1/events/",
+    "/api/v1/notifications/",
+    "/api/v1/chat/general",
+    "/api/v1/marketplace/",
+    "/api/v1/users/",
+])
+def test_garbage_cursor_is_rejected(client, url):
+    _, headers = create_user(client, "admin@example.com", is_superuser=True)
+    for before in ("garbage", "W10", "WyJub3QgYSBkYXRlIiwgMV0"):
+        response = client.get(url, headers=headers, params={"before": before})
+        assert response.status_code == 400, before
+        assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,153 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from app.core import security
+from app.core.config import settings
+from app.models.models import Event, Participation, User
+from tests.conftest import buddy_graph_and_rebuild, create_user
+
+# Users per race; the races send 1100 and 2000 registrations at once.
+# SQLite serializes every write, so each race takes several seconds here;
+# Postgres only serializes registrations for the same event.
+USERS = 1000
+CAPACITY = 300
+
+
+async def _register(api, headers: dict, event_id: int) -> int:
+    response = await api.post(f"/api/v1/events/{event_id}/register", headers=headers)
+    if response.status_code == 200:
+        assert response.json()["event_id"] == event_id
+    return response.status_code
+
+
+async def _race(api, event_id: int, users):
+    """Everyone in `users` (id, headers) registers for the event at once"""
+    return await asyncio.gather(*(_register(api, headers, event_id) for _, headers in users))
+
+
+async def _state(db, event_id: int):
+    registered_count = (await db.execute(
+        select(Event.registered_count).where(Event.id == event_id)
+    )).scalar_one()
+    per_user = (await db.execute(
+        select(Participation.user_id, func.count())
+        .where(Participation.event_id == event_id)
+        .group_by(Participation.user_id)
+    )).all()
+    return registered_count, dict(per_user)
+
+
+@pytest.fixture(autouse=True)
+def small_buddy_graph(monkeypatch):
+    # Events in the races outgrow the graph early, as large events do, instead
+    # of writing a quadratic number of pairs; the transition is checked too
+    monkeypatch.setattr(settings, "BUDDY_GRAPH_MAX_EVENT_SIZE", 50)
+
+
+@pytest.fixture
+async def users(db, api):
+    """USERS signed-in users: (id, Authorization headers)"""
+    await db.execute(insert(User), [
+        {"email": f"user{i}@example.com", "hashed_password": "x"} for i in range(USERS)
+    ])
+    await db.commit()
+    user_ids = (await db.execute(select(User.id).order_by(User.id))).scalars().all()
+    await db.rollback()  # an open read transaction would block every writer
+    users = [
+        (user_id, {"Authorization": f"Bearer {security.create_access_token(user_id)}"})
+        for user_id in user_ids
+    ]
+    # Load every principal into the cache first. Otherwise each registration
+    # reads the user before it writes, and SQLite fails a read transaction
+    # that has to become a write while other writers wait, rather than
+    # queueing it ("database is locked").
+    for response in await asyncio.gather(*(api.get("/api/v1/users/me", headers=h) for _, h in users)):
+        assert response.status_code == 200
+    return users
+
+
+@pytest.mark.anyio
+async def test_capacity_is_never_exceeded(db, api, users):
+    event_id = (await db.execute(
+        insert(Event).values(title="Workshop", capacity=CAPACITY).returning(Event.id)
+    )).scalar_one()
+    await db.commit()
+
+    # Everyone at once, and the first hundred users twice
+    outcomes = Counter(await _race(api, event_id, users + users[:100]))
+
+    assert outcomes[200] == CAPACITY
+    assert set(outcomes) <= {200, 400, 409}
+    registered_count, per_user = await _state(db, event_id)
+    assert registered_count == CAPACITY
+    assert len(per_user) == CAPACITY and set(per_user.values()) == {1}
+    maintained, rebuilt = await buddy_graph_and_rebuild()
+    assert maintained == rebuilt
+
+
+@pytest.mark.anyio
+async def test_duplicate_registrations_count_once(db, api, users):
+    event_id = (await db.execute(insert(Event).values(title="Open day").returning(Event.id))).scalar_one()
+    await db.commit()
+
+    outcomes = Counter(await _race(api, event_id, users * 2))
+
+    assert outcomes == {200: USERS, 400: USERS}
+    registered_count, per_user = await _state(db, event_id)
+    assert registered_count == USERS
+    assert per_user == {user_id: 1 for user_id, _ in users}
+    maintained, rebuilt = await buddy_graph_and_rebuild()
+    assert maintained == rebuilt
+
+
+def _create_event(client, headers, **fields) -> int:
+    response = client.post("/api/v1/events/", headers=headers, json={"title": "Seminar", **fields})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def _bulk_register(client, headers, event_id, user_ids) -> dict:
+    response = client.post(
+        f"/api/v1/events/{event_id}/register/bulk", headers=headers, json={"user_ids": user_ids}
+    )
+    assert response.status_code == 200
+    return {r["user_id"]: r["status"] for r in response.json()["results"]}
+
+
+def test_deleting_a_user_gives_back_their_seat(client):
+    _, admin = create_user(client, "admin@example.com", role="college_admin")
+    leaver, leaver_headers = create_user(client, "leaver@example.com")
+    newcomer, _ = create_user(client, "newcomer@example.com")
+    event_id = _create_event(client, admin, capacity=1)
+    assert _bulk_register(client, admin, event_id, [leaver]) == {leaver: "registered"}
+
+    assert client.delete(f"/api/v1/users/{leaver}", headers=leaver_headers).status_code == 200
+
+    assert client.get(f"/api/v1/events/{event_id}").json()["registered_count"] == 0
+    assert _bulk_register(client, admin, event_id, [newcomer]) == {newcomer: "registered"}
+
+
+def test_event_rejoins_buddy_graph_when_deleted_users_bring_it_under_the_limit(client, monkeypatch):
+    monkeypatch.setattr(settings, "BUDDY_GRAPH_MAX_EVENT_SIZE", 3)
+    _, admin = create_user(client, "admin@example.com", role="college_admin")
+    users = [create_user(client, f"user{i}@example.com") for i in range(5)]
+    ids = [user_id for user_id, _ in users]
+    small, large = _create_event(client, admin), _create_event(client, admin)
+    _bulk_register(client, admin, small, ids[:3])
+    _bulk_register(client, admin, large, ids)  # over the limit: not in the graph
+
+    for user_id, headers in users[3:]:
+        assert client.delete(f"/api/v1/users/{user_id}", headers=headers).status_code == 200
+    maintained, rebuilt = client.portal.call(buddy_graph_and_rebuild)
+    assert maintained == rebuilt
+    # Both events now count, so the three remaining users share two
+    assert {shared for _, _, shared in maintained[0]} == {2}
+
+    # Deleting the event takes its pairs back out
+    assert client.delete(f"/api/v1/events/{large}", headers=admin).status_code == 200
+    maintained, rebuilt = client.portal.call(buddy_graph_and_rebuild)
+    assert maintained == rebuilt
+    assert {shared for _, _, shared in maintained[0]} == {1}
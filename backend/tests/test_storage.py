@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import pytest
+
+from app.utils.storage import LocalStorage, MemoryStorage, SupabaseStorage, create_storage
+
+# How long each fake Supabase request blocks its thread
+REQUEST_SECONDS = 0.3
+
+
+class SlowBucket:
+    """Stands in for the synchronous Supabase bucket client"""
+
+    def __init__(self):
+        self.uploaded = []
+        self.removed = []
+
+    def upload(self, path, content, file_options=None):
+        time.sleep(REQUEST_SECONDS)
+        self.uploaded.append(path)
+
+    def remove(self, paths):
+        time.sleep(REQUEST_SECONDS)
+        self.removed.extend(paths)
+
+
+class SlowClient:
+    def __init__(self):
+        self.bucket = SlowBucket()
+        self.storage = self
+
+    def from_(self, name):
+        return self.bucket
+
+
+def test_backend_is_chosen_by_setting():
+    assert isinstance(create_storage("memory"), MemoryStorage)
+    assert isinstance(create_storage("local"), LocalStorage)
+    with pytest.raises(ValueError):
+        create_storage("ftp")
+
+
+@pytest.mark.anyio
+async def test_memory_backend_round_trip(anyio_backend, tmp_path):
+    storage = create_storage("memory")
+    spooled = tmp_path / "upload"
+    spooled.write_bytes(b"%PDF-1.4")
+
+    url = await storage.upload_verification_document(7, "card.PDF", spooled)
+    variants = await storage.save_image_variants("blobs/ab/abc", {"thumb": b"t", "full": b"f"})
+
+    path = url.removeprefix("memory://")
+    assert path.startswith("users/7/verification/id_card_") and path.endswith(".pdf")
+    assert storage.objects[path] == (b"%PDF-1.4", "application/pdf")
+    assert variants == {
+        "thumb": "memory://blobs/ab/abc_thumb.webp",
+        "full": "memory://blobs/ab/abc_full.webp",
+    }
+    assert storage.stats() == {"backend": "memory", "objects": 3, "bytes": 10}
+
+    assert await storage.delete_file(path)
+    assert path not in storage.objects
+
+
+async def _max_stall(work) -> tuple:
+    """
+    Await `work()` while measuring how late a 10ms timer fires; returns
+    (result, longest stall, elapsed seconds)
+    """
+    stalls = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            stalls.append(time.perf_counter() - started - 0.01)
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(0)  # the probe is waiting on its timer
+    started = time.perf_counter()
+    result = await work()
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+    return result, max(stalls), elapsed
+
+
+@pytest.mark.anyio
+async def test_slow_uploads_do_not_block_the_event_loop(anyio_backend):
+    storage = SupabaseStorage(url="http://supabase.test", key="")
+    storage.client = SlowClient()
+    count = 16
+
+    urls, stall, elapsed = await _max_stall(lambda: asyncio.gather(*(
+        storage.save(f"blobs/{i:02}/image.png", b"x" * 1000, ".png") for i in range(count)
+    )))
+
+    assert all(urls) and len(storage.client.bucket.uploaded) == count
+    # Blocking calls run on the storage pool: the loop keeps serving timers,
+    # and the requests overlap instead of running one after another
+    assert stall < 0.1
+    assert elapsed < count * REQUEST_SECONDS / 2
+
+    deleted, stall, _ = await _max_stall(lambda: asyncio.gather(*(
+        storage.delete_file(f"blobs/{i:02}/image.png") for i in range(count)
+    )))
+    assert all(deleted) and len(storage.client.bucket.removed) == count
+    assert stall < 0.1
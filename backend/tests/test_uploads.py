@@ -0,0 +1,150 @@
+from io import BytesIO
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.models import Blob
+from app.services.blob_gc import BlobCollector
+from app.services.image_pipeline import IMAGE_VARIANTS, image_pipeline
+from app.utils.storage import storage
+from app.utils.uploads import IMAGE_EXTENSIONS, receive_upload
+from tests.conftest import create_user
+
+LIMIT = 1000
+
+
+def _png(width: int, height: int, color=(200, 30, 30)) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _upload_profile_image(client, headers, content: bytes, filename="photo.png"):
+    return client.post(
+        "/api/v1/users/me/profile-image", headers=headers,
+        files={"file": (filename, content, "image/png")},
+    )
+
+
+def _blobs(client) -> dict:
+    """image_url -> ref_count of every blob row"""
+    async def load():
+        async with AsyncSessionLocal() as session:
+            return dict((await session.execute(select(Blob.image_url, Blob.ref_count))).all())
+    return client.portal.call(load)
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    """Directory uploads are spooled to, with UPLOAD_MAX_IMAGE_BYTES lowered to LIMIT"""
+    monkeypatch.setattr(settings, "UPLOAD_TMP_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "UPLOAD_MAX_IMAGE_BYTES", LIMIT)
+    return tmp_path
+
+
+def test_oversize_upload_is_rejected(client, spool_dir):
+    _, headers = create_user(client, "ada@example.com")
+
+    response = _upload_profile_image(client, headers, b"x" * (LIMIT + 1))
+    assert response.status_code == 413
+    assert list(spool_dir.iterdir()) == []
+    assert client.get("/api/v1/users/me", headers=headers).json()["profile_image_url"] is None
+
+
+def test_wrong_extension_is_rejected(client, spool_dir):
+    _, headers = create_user(client, "ada@example.com")
+
+    response = _upload_profile_image(client, headers, b"x", filename="script.sh")
+    assert response.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_size_limit_is_enforced_while_streaming(anyio_backend, spool_dir, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 100)
+    # No declared size: the limit is only crossed part way through the copy
+    file = UploadFile(BytesIO(b"x" * (LIMIT + 1)), filename="photo.png")
+
+    with pytest.raises(HTTPException) as error:
+        async with receive_upload(file, IMAGE_EXTENSIONS, LIMIT):
+            pass
+    assert error.value.status_code == 413
+    assert list(spool_dir.iterdir()) == []
+
+    file = UploadFile(BytesIO(b"x" * LIMIT), filename="photo.png")
+    async with receive_upload(file, IMAGE_EXTENSIONS, LIMIT) as upload:
+        assert upload.size == LIMIT and upload.path.read_bytes() == b"x" * LIMIT
+    assert list(spool_dir.iterdir()) == []
+
+
+@pytest.fixture
+def pipeline(client, monkeypatch):
+    """The image pipeline with one worker process (tests run without it)"""
+    monkeypatch.setattr(image_pipeline, "workers", 1)
+    yield image_pipeline
+    client.portal.call(image_pipeline.stop)
+
+
+def test_invalid_image_is_rejected(client, pipeline):
+    _, headers = create_user(client, "ada@example.com")
+    objects = dict(storage.objects)
+
+    response = _upload_profile_image(client, headers, b"not a png at all")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid image file"
+    assert storage.objects == objects
+
+
+def test_image_is_stored_as_webp_variants(client, pipeline):
+    _, headers = create_user(client, "ada@example.com")
+
+    response = _upload_profile_image(client, headers, _png(2000, 1000))
+    assert response.status_code == 200
+    variants = response.json()["profile_image_variants"]
+    assert set(variants) == set(IMAGE_VARIANTS)
+    assert response.json()["profile_image_url"] == variants["full"]
+
+    for name, url in variants.items():
+        content, content_type = storage.objects[url.removeprefix("memory://")]
+        assert content_type == "image/webp"
+        with Image.open(BytesIO(content)) as image:
+            # Longest side scaled down to the variant's size, aspect ratio kept
+            assert image.size == (IMAGE_VARIANTS[name], IMAGE_VARIANTS[name] // 2)
+
+
+def test_same_image_is_stored_once(client):
+    _, ada = create_user(client, "ada@example.com")
+    _, bob = create_user(client, "bob@example.com")
+    objects = len(storage.objects)
+
+    urls = {
+        _upload_profile_image(client, headers, _png(40, 40)).json()["profile_image_url"]
+        for headers in (ada, bob)
+    }
+
+    assert len(urls) == 1
+    assert _blobs(client) == {urls.pop(): 2}
+    assert len(storage.objects) == objects + 1
+
+
+def test_released_blobs_are_collected(client):
+    _, ada = create_user(client, "ada@example.com")
+    _, bob = create_user(client, "bob@example.com")
+    shared = _upload_profile_image(client, ada, _png(40, 40)).json()["profile_image_url"]
+    _upload_profile_image(client, bob, _png(40, 40))
+    collector = BlobCollector(interval_seconds=0, grace_seconds=0)
+
+    # Ada moves on; Bob still uses the image, so nothing is collected
+    own = _upload_profile_image(client, ada, _png(40, 40, color=(0, 0, 255))).json()["profile_image_url"]
+    assert _blobs(client) == {shared: 1, own: 1}
+    assert client.portal.call(collector.collect) == 0
+
+    _upload_profile_image(client, bob, _png(40, 40, color=(0, 0, 255)))
+    assert _blobs(client) == {shared: 0, own: 2}
+    assert client.portal.call(collector.collect) == 1
+    assert _blobs(client) == {own: 2}
+    assert shared.removeprefix("memory://") not in storage.objects
+    assert own.removeprefix("memory://") in storage.objects
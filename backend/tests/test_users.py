@@ -0,0 +1,112 @@
+import random
+import time
+
+from sqlalchemy import func, insert, select
+
+from app.core import security
+from app.db.session import AsyncSessionLocal
+from app.models.models import Event, Participation, User
+from app.services import event_service
+from tests.conftest import create_user
+
+# Benchmark size: 10000 events of 10 attendees drawn from 5000 students
+PARTICIPATIONS = 100_000
+EVENT_SIZE = 10
+STUDENTS = 5000
+
+
+def _me(client, headers) -> tuple:
+    body = client.get("/api/v1/users/me", headers=headers).json()
+    return body["events_count"], body["buddies_count"]
+
+
+def _create_event(client, headers) -> int:
+    response = client.post("/api/v1/events/", headers=headers, json={"title": "Meetup"})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_profile_counters_follow_registrations_and_event_deletes(client):
+    _, admin = create_user(client, "admin@example.com", role="college_admin")
+    _, ada = create_user(client, "ada@example.com")
+    _, bob = create_user(client, "bob@example.com")
+    event_id = _create_event(client, admin)
+
+    assert client.post(f"/api/v1/events/{event_id}/register", headers=ada).status_code == 200
+    assert _me(client, ada) == (1, 0)  # now cached
+
+    # Bob's registration makes Ada his buddy, and him hers
+    assert client.post(f"/api/v1/events/{event_id}/register", headers=bob).status_code == 200
+    assert _me(client, ada) == (1, 1)
+    assert _me(client, bob) == (1, 1)
+
+    assert client.delete(f"/api/v1/events/{event_id}", headers=admin).status_code == 200
+    assert _me(client, ada) == (0, 0)
+    assert _me(client, bob) == (0, 0)
+
+
+def test_profile_read_benchmark(client, statements):
+    """
+    /users/me with stored counters against the per-request recount it
+    replaced, over 100k participations
+    """
+    async def seed():
+        rng = random.Random(17)
+        async with AsyncSessionLocal() as session:
+            await session.execute(insert(User), [
+                {"email": f"student{i}@example.com", "hashed_password": "x"} for i in range(STUDENTS)
+            ])
+            user_ids = list((await session.execute(select(User.id))).scalars())
+            events = PARTICIPATIONS // EVENT_SIZE
+            await session.execute(insert(Event), [
+                {"title": f"Event {i}", "registered_count": EVENT_SIZE} for i in range(events)
+            ])
+            event_ids = list((await session.execute(select(Event.id))).scalars())
+            await session.execute(insert(Participation), [
+                {"user_id": user_id, "event_id": event_id, "status": "registered"}
+                for event_id in event_ids for user_id in rng.sample(user_ids, EVENT_SIZE)
+            ])
+            await event_service.rebuild_buddy_graph(session)
+            await event_service.recompute_user_counters(session)
+            await session.commit()
+            return rng.sample(user_ids, 50)
+
+    sample = client.portal.call(seed)
+
+    async def recount(session, user_id):
+        """What read_user_me computed on every request before the counters were stored"""
+        events_count = (await session.execute(
+            select(func.count(Participation.id)).where(Participation.user_id == user_id)
+        )).scalar()
+        attended = select(Participation.event_id).where(Participation.user_id == user_id).subquery()
+        buddies_count = (await session.execute(
+            select(func.count(func.distinct(Participation.user_id)))
+            .where(Participation.event_id.in_(select(attended)), Participation.user_id != user_id)
+        )).scalar()
+        return events_count, buddies_count
+
+    async def stored(session, user_id):
+        """What /users/me loads when the principal is not cached"""
+        return (await session.execute(select(User).where(User.id == user_id))).scalar_one()
+
+    async def timed(read):
+        async with AsyncSessionLocal() as session:
+            started = time.perf_counter()
+            results = [await read(session, user_id) for user_id in sample]
+            return results, time.perf_counter() - started
+
+    expected, recount_seconds = client.portal.call(timed, recount)
+    _, stored_seconds = client.portal.call(timed, stored)
+
+    statements.clear()
+    for user_id, counts in zip(sample, expected):
+        headers = {"Authorization": f"Bearer {security.create_access_token(user_id)}"}
+        assert _me(client, headers) == counts
+    print(
+        f"\n/users/me over {PARTICIPATIONS} participations, {len(sample)} users: "
+        f"recount {recount_seconds * 1000:.0f} ms, stored counters {stored_seconds * 1000:.0f} ms"
+    )
+    # One primary-key SELECT per cold principal, and no writes
+    assert len(statements) == len(sample)
+    assert all(s.lstrip().upper().startswith("SELECT") for s in statements)
+    assert stored_seconds < recount_seconds
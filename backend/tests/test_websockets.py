@@ -0,0 +1,228 @@
+import asyncio
+import json
+
+import fakeredis
+import pytest
+
+from app.websockets import manager as manager_module
+from app.websockets.backplane import RedisBackplane
+from app.websockets.manager import SLOW_CONSUMER_CLOSE_CODE, ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames = []
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.frames.append(data)
+        self.sent.append(json.loads(data))
+
+
+class StuckWebSocket(FakeWebSocket):
+    """A client that stops reading: sends never complete"""
+
+    def __init__(self):
+        super().__init__()
+        self.close_codes = []
+
+    async def send_text(self, data: str):
+        await asyncio.Event().wait()
+
+    async def close(self, code: int = 1000):
+        self.close_codes.append(code)
+
+
+async def _settle():
+    # Let the backplane listeners relay and the writer tasks drain
+    for _ in range(20):
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def workers(anyio_backend):
+    """Two connection managers, as in two worker processes, sharing one Redis"""
+    server = fakeredis.FakeServer()
+    managers = []
+    for _ in range(2):
+        manager = ConnectionManager(max_queue_size=100, slow_consumer_policy="drop")
+        manager.backplane = RedisBackplane(
+            fakeredis.FakeAsyncRedis(server=server, decode_responses=True), "test:ws"
+        )
+        await manager.backplane.start(manager._relay)
+        managers.append(manager)
+    await _settle()  # subscriptions are in place
+    yield managers
+    for manager in managers:
+        await manager.stop()
+
+
+@pytest.mark.anyio
+async def test_messages_cross_workers_once(workers):
+    a, b = workers
+    sender, member, outsider = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    await a.connect(sender, 1)
+    member_connection = await b.connect(member, 2)
+    await b.connect(outsider, 3)
+    b.join(member_connection, "club")
+
+    await a.broadcast_to_channel({"text": "club"}, "club")
+    await a.send_personal_message({"text": "personal"}, 2)
+    await a.broadcast({"text": "everyone"})
+    await _settle()
+
+    assert member.sent == [{"text": "club"}, {"text": "personal"}, {"text": "everyone"}]
+    assert outsider.sent == [{"text": "everyone"}]
+    # Local sockets are served directly; the worker skips its own publications
+    assert sender.sent == [{"text": "everyone"}]
+    assert a.backplane.published == 3
+    assert a.backplane.relayed == 0
+    assert b.backplane.relayed == 3
+
+
+@pytest.mark.anyio
+async def test_profile_updates_reach_other_workers(workers):
+    a, b = workers
+    connection = await b.connect(FakeWebSocket(), 7, {"full_name": "Old"})
+
+    await a.update_user_profile(7, {"full_name": "New"})
+    await _settle()
+
+    assert connection.display_name == "New"
+
+
+@pytest.fixture
+def encodes(monkeypatch):
+    """Payloads the connection manager serializes"""
+    encoded = []
+
+    def encode_message(message):
+        encoded.append(message)
+        return original(message)
+
+    original = manager_module.encode_message
+    monkeypatch.setattr(manager_module, "encode_message", encode_message)
+    return encoded
+
+
+@pytest.fixture
+async def manager(anyio_backend):
+    """A connection manager without a backplane, as in a single worker"""
+    manager = ConnectionManager(max_queue_size=100, slow_consumer_policy="drop")
+    yield manager
+    for connections in list(manager.active_connections.values()):
+        for connection in list(connections):
+            manager.disconnect(connection)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("sockets", [1000, 10000])
+async def test_channel_messages_cost_one_send_per_member(manager, sockets):
+    websockets = [FakeWebSocket() for _ in range(sockets)]
+    connections = [await manager.connect(websocket, i) for i, websocket in enumerate(websockets)]
+    for connection in connections[:50]:
+        manager.join(connection, "chess-club")
+
+    await manager.broadcast_to_channel({"text": "e4"}, "chess-club")
+    await _settle()
+    assert manager.sent_messages == 50
+    assert [len(websocket.sent) for websocket in websockets[:51]] == [1] * 50 + [0]
+
+    manager.leave(connections[0], "chess-club")
+    manager.disconnect(connections[1])
+    await manager.broadcast_to_channel({"text": "e5"}, "chess-club")
+    await _settle()
+    assert manager.sent_messages == 50 + 48
+    assert len(manager.channels["chess-club"]) == 48
+
+
+def test_join_and_leave_frames(client):
+    from tests.conftest import create_user
+
+    tokens = []
+    for name in ("sender", "member", "outsider"):
+        _, headers = create_user(client, f"{name}@example.com", full_name=name.title())
+        tokens.append(headers["Authorization"].split()[1])
+
+    def sync(websocket):
+        # Frames on a socket are handled in order: once the socket's own
+        # message comes back, everything it sent before has been applied
+        websocket.send_json({"content": "sync", "channel": "sync"})
+        assert websocket.receive_json()["content"] == "sync"
+
+    with client.websocket_connect(f"/api/v1/ws/{tokens[0]}") as sender, \
+            client.websocket_connect(f"/api/v1/ws/{tokens[1]}") as member, \
+            client.websocket_connect(f"/api/v1/ws/{tokens[2]}") as outsider:
+        member.send_json({"type": "join", "channel": "club"})
+        sync(member)
+        # Posting subscribes the sender too
+        sender.send_json({"content": "club only", "channel": "club"})
+        assert sender.receive_json()["content"] == "club only"
+        assert member.receive_json()["content"] == "club only"
+
+        member.send_json({"type": "leave", "channel": "club"})
+        sync(member)
+        sender.send_json({"content": "still club", "channel": "club"})
+        assert sender.receive_json()["content"] == "still club"
+        sender.send_json({"content": "everyone"})
+        # Neither club message reached the outsider, nor the second the member
+        assert outsider.receive_json()["content"] == "everyone"
+        assert member.receive_json()["content"] == "everyone"
+
+
+@pytest.mark.anyio
+async def test_broadcasts_are_encoded_once(manager, encodes):
+    websockets = [FakeWebSocket() for _ in range(1000)]
+    for i, websocket in enumerate(websockets):
+        connection = await manager.connect(websocket, i % 10)
+        manager.join(connection, "club")
+
+    await manager.broadcast({"type": "notification", "title": "Fest"})
+    await manager.broadcast_to_channel({"content": "hi"}, "club")
+    await manager.send_personal_message({"content": "dm"}, 3)
+    await _settle()
+
+    assert len(encodes) == 3
+    # Every recipient is sent the very same string
+    for index in range(2):
+        assert len({id(websocket.frames[index]) for websocket in websockets}) == 1
+    assert [len(websocket.frames) for websocket in websockets[:10]] == [2, 2, 2, 3, 2, 2, 2, 2, 2, 2]
+
+
+@pytest.mark.anyio
+async def test_backplane_relays_the_encoded_frame(workers, encodes):
+    a, b = workers
+    local, remote = FakeWebSocket(), FakeWebSocket()
+    await a.connect(local, 1)
+    await b.connect(remote, 2)
+
+    await a.broadcast({"type": "notification", "title": "Fest"})
+    await _settle()
+
+    # Encoded once by the publishing worker; the other one relays it as is
+    assert len(encodes) == 1
+    assert local.frames == remote.frames
+
+
+@pytest.mark.anyio
+async def test_slow_consumer_is_disconnected(anyio_backend):
+    manager = ConnectionManager(max_queue_size=2, slow_consumer_policy="disconnect")
+    stuck, healthy = StuckWebSocket(), FakeWebSocket()
+    await manager.connect(stuck, 1)
+    await manager.connect(healthy, 2)
+
+    for i in range(4):
+        await manager.broadcast({"n": i})
+        await asyncio.sleep(0)  # writers take what they can
+    # The close is in flight, held by the manager rather than left to the GC
+    assert len(manager._close_tasks) == 1
+    await _settle()
+
+    assert stuck.close_codes == [SLOW_CONSUMER_CLOSE_CODE]
+    assert manager._close_tasks == set()
+    assert list(manager.active_connections) == [2]
+    assert [frame["n"] for frame in healthy.sent] == [0, 1, 2, 3]
+    assert manager.stats()["slow_consumer_disconnects"] == 1